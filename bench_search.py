@@ -0,0 +1,99 @@
+# bench_search.py
+# Benchmark del buscador difuso del popup: arma una biblioteca sintética
+# (por defecto 50k mensajes) y mide SearchIndex.search_ranked contra el presupuesto.
+#   python bench_search.py [--snippets 50000] [--budget-ms 5] [--seed 1]
+import argparse, random, statistics, sys, time
+
+import clipbuddy_core as cb
+
+WORDS = ("hola como estas gracias por tu compra envio gratis link kit insumos curso "
+         "cerveza bebidas fermentacion receta stock disponible promo membresia consulta "
+         "whatsapp pedido pago transferencia factura mercadopago cuotas retiro sucursal "
+         "lupulo malta levadura botella tapas barril calculadora comunidad descuento").split()
+URL_PREFIXES = ("https://articulo.mercadolibre.com.ar/MLA-", "https://wa.me/message/",
+                "https://www.tienda.com/productos/kit-", "https://nsncerveceria.mercadoshops.com.ar/MLA-")
+EMOJI = ("🍻", "🍺", "✅", "📦", "😊")
+
+def synthetic_vocabulary(rnd, size=6000):
+    """ Palabras del rubro + palabras inventadas, con frecuencias tipo Zipf (pocas muy comunes). """
+    syllables = ("ma", "re", "ti", "co", "la", "pe", "dor", "cion", "se", "ven", "tra", "mos", "ble", "gu")
+    words = list(WORDS)
+    while len(words) < size:
+        words.append("".join(rnd.choices(syllables, k=rnd.randint(2, 4))))
+    cum, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1.0 / rank
+        cum.append(total)
+    return words, cum
+
+def synthetic_data(n, seed=1, groups=40):
+    """ dict[grupo, list[str]] con n mensajes parecidos a los reales (multilínea, URLs, emojis). """
+    rnd = random.Random(seed)
+    words, cum = synthetic_vocabulary(rnd)
+    data = {f"{i}-Grupo {rnd.choice(WORDS)}": [] for i in range(groups)}
+    names = list(data)
+    for _ in range(n):
+        parts = [" ".join(rnd.choices(words, cum_weights=cum, k=rnd.randint(4, 25)))
+                 for _ in range(rnd.randint(1, 3))]
+        if rnd.random() < 0.4:
+            # Links largos como los de la biblioteca real: id + slug del producto
+            slug = "-".join(rnd.choices(words[:len(WORDS)], k=rnd.randint(0, 8)))
+            parts.append(rnd.choice(URL_PREFIXES) + str(rnd.randint(10**8, 10**9)) + (f"-{slug}-_JM" if slug else ""))
+        if rnd.random() < 0.3:
+            parts.append(rnd.choice(EMOJI))
+        data[rnd.choice(names)].append("\n".join(parts).capitalize())
+    return data
+
+QUERIES = ["hola", "envio gratis", "envoi", "mercadolibre", "kit insumos", "fermentasion",
+           "membresia", "calculdora", "link", "whatsapp pedido", "cuotas sin", "lupulo malta"]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--snippets", type=int, default=50_000)
+    ap.add_argument("--budget-ms", type=float, default=5.0)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    data = cb.Library(cb.wrap_data(synthetic_data(args.snippets, args.seed)))
+    t0 = time.perf_counter()
+    index = cb.SearchIndex(data)
+    print(f"{args.snippets} mensajes, índice armado en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    worst = 0.0
+    for q in QUERIES:
+        # Simula el tecleo: cada prefijo de la consulta es una búsqueda
+        samples = []
+        for _ in range(args.repeat):
+            for k in range(1, len(q) + 1):
+                t0 = time.perf_counter()
+                index.search_ranked(cb.VIRTUAL_ALL, q[:k])
+                samples.append((time.perf_counter() - t0) * 1000)
+        full = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            hits = index.search_ranked(cb.VIRTUAL_ALL, q)
+            full.append((time.perf_counter() - t0) * 1000)
+        med = statistics.median(full)
+        worst = max(worst, med)
+        print(f"{q!r:20} {len(hits):4} res  consulta {med:6.2f} ms  "
+              f"tecleo p50 {statistics.median(samples):6.2f} ms  max {max(samples):6.2f} ms")
+
+    # El mismo tecleo a través de la caché del popup (se repite: los agentes tipean lo mismo todo el día)
+    cache = cb.QueryCache()
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for q in QUERIES:
+            for k in range(1, len(q) + 1):
+                p = q[:k]
+                cache.get(cb.VIRTUAL_ALL, p, data.version,
+                          lambda: index.search_ranked(cb.VIRTUAL_ALL, p),
+                          lambda prev, ids: index.refine_ranked(cb.VIRTUAL_ALL, p, prev, ids))
+    print(f"tecleo con caché: {(time.perf_counter() - t0) * 1000:.0f} ms en total, {cache.summary()}")
+
+    ok = worst <= args.budget_ms
+    print(f"peor mediana {worst:.2f} ms / presupuesto {args.budget_ms} ms -> {'OK' if ok else 'EXCEDIDO'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# bench_suite.py
+# Benchmarks del núcleo (sin GUI) para bibliotecas sintéticas de 1k a 500k mensajes:
+# guardar, cargar, indexar, buscar como el popup, filtrar como el gestor, exportar e importar.
+# Informa tiempo (mediana) y pico de memoria por operación; con --baseline compara contra
+# una corrida anterior y sale con 1 si algo empeoró más que la tolerancia.
+#   python bench_suite.py [--sizes 1000,10000,100000] [--storage json|sqlite] [--snapshot json|zlib|zstd] [--save base.json]
+#   python bench_suite.py --baseline base.json [--max-slowdown 0.25] [--max-memory-growth 0.25]
+#   (la referencia tiene que ser del mismo --storage y --snapshot: si no, no se compara y sale con 2)
+import argparse, json, os, shutil, statistics, sys, tempfile, time, tracemalloc
+
+import clipbuddy_core as cb
+from bench_search import synthetic_data, QUERIES
+
+DEFAULT_SIZES = "1000,10000,100000"
+NOISE_MS = 1.0      # diferencias menores a esto no cuentan como regresión (ruido del reloj)
+
+class Library:
+    """ Estado compartido por las operaciones de una corrida (una biblioteca de un tamaño). """
+    def __init__(self, n, seed, backend, workdir):
+        self.n = n
+        self.backend = backend
+        self.raw = synthetic_data(n, seed)
+        self.data = cb.wrap_data(self.raw)
+        self.storage = None
+        self.index = None
+        self.boost = {}
+        self.csv_path = os.path.join(workdir, "export.csv")
+        # El grupo más grande es el peor caso del gestor
+        self.big_group = max(self.raw, key=lambda g: len(self.raw[g]))
+
+    def close(self):
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+# ---------- Operaciones ----------
+# Cada una recibe la Library; las que arman algo lo dejan ahí para las siguientes.
+def op_save(lib):
+    """ Snapshot completo (save_data en JSON; reescritura de la base en SQLite). """
+    if lib.backend == "json":
+        cb.save_data(lib.raw)
+    else:
+        s = cb.SqliteStorage()
+        s.open()
+        s.write_all(lib.data)
+        s.close()
+
+def op_load(lib):
+    """ Lo que hace la app al arrancar: abrir la biblioteca y armar los Snippet. """
+    lib.close()
+    lib.storage = cb.open_storage(lib.backend)
+    lib.data = lib.storage.load()
+
+def op_load_data(lib):
+    """ load_data: snapshot + journal como texto plano (sólo JSON). """
+    cb.load_data()
+
+def op_index(lib):
+    lib.index = lib.storage.make_index(lib.data)
+    lib.boost = cb.UsageStore(os.devnull).boosts(lib.index)
+
+def _popup_items(lib, q):
+    """ Lo mismo que Popup.current_items_for_group sobre VIRTUAL_ALL. """
+    index = lib.index
+    with index.lock:
+        docs = index.docs
+        if q:
+            ids = index.search_ranked(cb.VIRTUAL_ALL, q, boost=lib.boost)
+        else:
+            ids = cb.by_frecency(index.search(cb.VIRTUAL_ALL, q), lib.boost)
+        return [(f"[{docs[i][0]}] " + docs[i][1].display, docs[i][1]) for i in ids]
+
+def op_popup_all(lib):
+    _popup_items(lib, "")
+
+def op_popup_search(lib):
+    for q in QUERIES:
+        _popup_items(lib, q)
+
+def op_manager_rows(lib):
+    """ ManagerWindow.refresh_messages sobre el grupo más grande: sin filtro y con filtro. """
+    msgs = lib.data[lib.big_group]
+    lib.index.message_rows(msgs, lib.big_group, "")
+    lib.index.message_rows(msgs, lib.big_group, "kit")
+
+def op_export_csv(lib):
+    cb.export_to_csv(lib.data, lib.csv_path)
+
+def op_import_csv(lib):
+    cb.import_from_csv(lib.csv_path, {}, replace=True)
+
+# (nombre, función, repeticiones por defecto, sólo para el backend)
+OPERATIONS = [
+    ("save", op_save, 3, None),
+    ("load", op_load, 3, None),
+    ("load_data", op_load_data, 3, "json"),
+    ("index", op_index, 3, None),
+    ("popup_all", op_popup_all, 5, None),
+    ("popup_search", op_popup_search, 5, None),
+    ("manager_rows", op_manager_rows, 5, None),
+    ("export_csv", op_export_csv, 3, None),
+    ("import_csv", op_import_csv, 3, None),
+]
+
+def measure(fn, lib, repeat, memory):
+    """ (mediana en ms, pico de memoria en bytes o None). La memoria se mide en una corrida aparte. """
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(lib)
+        samples.append((time.perf_counter() - t0) * 1000)
+    peak = None
+    if memory:
+        # tracemalloc vuelve lento lo que mide: por eso no se mezcla con los tiempos
+        tracemalloc.start()
+        fn(lib)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return statistics.median(samples), peak
+
+def run_size(n, args, workdir):
+    path = os.path.join(workdir, f"bench-{n}", "snippets.json")
+    os.makedirs(os.path.dirname(path))
+    cb.use_snippets_file(path)
+    t0 = time.perf_counter()
+    lib = Library(n, args.seed, args.storage, workdir)
+    print(f"\n{n} mensajes en {len(lib.raw)} grupos (generados en {time.perf_counter() - t0:.1f} s)")
+    results = {}
+    try:
+        for name, fn, repeat, only in OPERATIONS:
+            if only and only != args.storage:
+                continue
+            ms, peak = measure(fn, lib, args.repeat or repeat, not args.no_memory)
+            results[name] = {"ms": round(ms, 3), "peak_bytes": peak}
+            mem = f"{peak / 2**20:9.1f} MiB" if peak is not None else ""
+            print(f"  {name:14} {ms:10.2f} ms {mem}")
+    finally:
+        lib.close()
+    return results
+
+def compare(results, baseline, max_slowdown, max_growth):
+    """ Líneas de regresión (vacío si todo está dentro de la tolerancia). """
+    bad = []
+    for size, ops in results.items():
+        for name, cur in ops.items():
+            ref = baseline.get(size, {}).get(name)
+            if not ref:
+                continue
+            if cur["ms"] > ref["ms"] * (1 + max_slowdown) and cur["ms"] - ref["ms"] > NOISE_MS:
+                bad.append(f"{size} {name}: {ref['ms']:.2f} -> {cur['ms']:.2f} ms")
+            if cur["peak_bytes"] and ref.get("peak_bytes") and cur["peak_bytes"] > ref["peak_bytes"] * (1 + max_growth):
+                bad.append(f"{size} {name}: {ref['peak_bytes'] / 2**20:.1f} -> {cur['peak_bytes'] / 2**20:.1f} MiB")
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help="tamaños separados por coma (hasta 500000)")
+    ap.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    ap.add_argument("--snapshot", choices=cb.SNAPSHOT_FORMATS, default="json", help="formato del snapshot JSON")
+    ap.add_argument("--repeat", type=int, default=0, help="repeticiones por operación (0 = las de cada una)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-memory", action="store_true", help="no medir el pico de memoria (más rápido)")
+    ap.add_argument("--save", help="guarda los resultados (JSON) para usarlos de referencia")
+    ap.add_argument("--baseline", help="resultados de referencia contra los que comparar")
+    ap.add_argument("--max-slowdown", type=float, default=0.25, help="tolerancia de tiempo (0.25 = +25%%)")
+    ap.add_argument("--max-memory-growth", type=float, default=0.25, help="tolerancia de memoria")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    try:
+        cb.use_snapshot_format(args.snapshot)
+    except ValueError as e:
+        ap.error(str(e))
+    workdir = tempfile.mkdtemp(prefix="clipbuddy-bench-")
+    try:
+        results = {str(n): run_size(n, args, workdir) for n in sizes}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "storage": args.storage, "snapshot": args.snapshot,
+                       "results": results}, f, indent=2)
+        print(f"\nresultados guardados en {args.save}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("storage", "json") != args.storage:
+            print(f"\nla referencia es de otro backend ({base.get('storage')}): no se compara")
+            return 2
+        # Referencias guardadas antes de registrar el formato: eran todas JSON
+        if base.get("snapshot", "json") != args.snapshot:
+            print(f"\nla referencia es de otro formato de snapshot ({base.get('snapshot', 'json')}): no se compara")
+            return 2
+        bad = compare(results, base["results"], args.max_slowdown, args.max_memory_growth)
+        print(f"\nregresiones contra {args.baseline}: {len(bad)}")
+        for line in bad:
+            print("  " + line)
+        return 1 if bad else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
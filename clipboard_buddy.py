@@ -1,112 +1,44 @@
 # clipboard_buddy_pro.py
-import os, json, csv, time, threading
+import time
+_T0 = time.perf_counter()   # referencia de --profile-startup
+import sys, importlib, threading, queue
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, simpledialog
-from tkinter.scrolledtext import ScrolledText
-import pyperclip, keyboard
+from tkinter import ttk
+from collections import deque, namedtuple
+
+# Persistencia, modelo, búsqueda e import/export viven en clipbuddy_core (sin GUI)
+from clipbuddy_core import (
+    VIRTUAL_ALL, VIRTUAL_HISTORY, is_virtual, COMPACT_EVERY_OPS, COMPACT_INTERVAL_MS, USAGE_FLUSH_MS,
+    GroupIds, Library, FULL_OPS, CLIPBOARD_FIELD, snippet_key, locate_message, wrap_data,
+    by_frecency, all_group_names, UsageStore, ClipboardHistory, HistoryEntry, QueryCache, open_storage,
+)
+
+class LazyModule:
+    """ Módulo que se importa la primera vez que se usa (diálogos, portapapeles: fuera del arranque). """
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+messagebox = LazyModule("tkinter.messagebox")
+filedialog = LazyModule("tkinter.filedialog")
+simpledialog = LazyModule("tkinter.simpledialog")
+statistics = LazyModule("statistics")
+pyperclip = LazyModule("pyperclip")
+keyboard = LazyModule("keyboard")   # se importa en el hilo de hotkeys, no en el de Tk
 
-APP_NAME = "ClipboardBuddyPro"
 DEFAULT_HOTKEY_POPUP = "ctrl+shift+space"   # abre el menú rápido
 DEFAULT_HOTKEY_MANAGER = "ctrl+shift+e"     # abre el gestor de grupos/mensajes
-VIRTUAL_ALL = "Todos Los mensajes"
-
-# ---------- Persistencia ----------
-def appdata_path():
-    base = os.environ.get("APPDATA") or os.path.expanduser("~")
-    folder = os.path.join(base, APP_NAME)
-    os.makedirs(folder, exist_ok=True)
-    return folder
-
-# Guardar junto al script (misma carpeta que el .py / .exe)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SNIPPETS_FILE = os.path.join(BASE_DIR, "snippets.json")
-
-DEFAULT_DATA = {
-    "General": [
-        "¡Gracias por tu compra!",
-        "¿Cómo puedo ayudarte?",
-        "Te paso el link en un momento."
-    ],
-    "Ventas": [
-        "Promo: membresía $5/mes con cursos, comunidad y calculadoras.",
-        "Envío en 24-48 h hábiles.",
-        "Stock disponible, ¡aprovechá!"
-    ]
-}
-
-def load_data():
-    # Crea archivo si no existe
-    if not os.path.exists(SNIPPETS_FILE):
-        with open(SNIPPETS_FILE, "w", encoding="utf-8") as f:
-            json.dump(DEFAULT_DATA, f, ensure_ascii=False, indent=2)
-    # Lee
-    with open(SNIPPETS_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    # Asegura estructura válida
-    if not isinstance(data, dict):
-        data = DEFAULT_DATA.copy()
-    # Nunca persistimos el grupo virtual
-    data.pop(VIRTUAL_ALL, None)
-    # Normaliza listas de texto
-    for g, msgs in list(data.items()):
-        if not isinstance(msgs, list):
-            data[g] = []
-        else:
-            data[g] = [str(m) for m in msgs if isinstance(m, (str, int, float))]
-    return data
-
-def save_data(data):
-    safe = dict(data)
-    safe.pop(VIRTUAL_ALL, None)
-    with open(SNIPPETS_FILE, "w", encoding="utf-8") as f:
-        json.dump(safe, f, ensure_ascii=False, indent=2)
-
-def all_group_names(data):
-    names = sorted([g for g in data.keys() if g != VIRTUAL_ALL], key=lambda s: s.lower())
-    return [VIRTUAL_ALL] + names
-
-def all_messages_pairs(data):
-    """ Devuelve lista de tuplas (grupo, mensaje) para el grupo virtual. """
-    pairs = []
-    for g, msgs in data.items():
-        if g == VIRTUAL_ALL:
-            continue
-        for m in msgs:
-            pairs.append((g, m))
-    return pairs
-
-def export_to_csv(data, filepath):
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["group", "message"])
-        for g, msgs in data.items():
-            if g == VIRTUAL_ALL:
-                continue
-            for m in msgs:
-                writer.writerow([g, m])
-
-def import_from_csv(filepath, data, replace=False):
-    if replace:
-        new_data = {}
-    else:
-        new_data = dict(data)
-
-    with open(filepath, "r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        if "group" not in reader.fieldnames or "message" not in reader.fieldnames:
-            raise ValueError("El CSV debe tener encabezados: group,message")
-
-        for row in reader:
-            g = str(row["group"]).strip()
-            m = str(row["message"])
-            if not g:
-                continue
-            lst = new_data.setdefault(g, [])
-            if m not in lst:
-                lst.append(m)
-
-    new_data.pop(VIRTUAL_ALL, None)
-    return new_data
+POPUP_WARM_STANDBY = True   # popup pre-armado y oculto: el hotkey sólo lo muestra
+SEARCH_DEBOUNCE_MS = 60     # espera tras la última tecla antes de buscar
+WATCH_INTERVAL_MS = 1000    # cada cuánto se miran los cambios hechos por otros procesos
+LOAD_POLL_MS = 15           # cada cuánto mira el hilo de Tk si terminó la carga en segundo plano
+HISTORY_POLL_MS = 500       # cada cuánto se mira si cambió el portapapeles (historial)
+STANDBY_REFRESH_MS = 1000   # el popup oculto se vuelve a filtrar cuando los cambios se calman
+PASTE_CONFIRM_TIMEOUT_MS = 500   # máximo a esperar que el portapapeles tenga el texto antes de Ctrl+V
+PASTE_CONFIRM_POLL_MS = 5        # cada cuánto se relee el portapapeles mientras se confirma
+PASTE_RESTORE_DELAY_MS = 300     # margen para que la otra app lea el portapapeles antes de restaurarlo
 
 # ---------- Diálogo multilinea para agregar/editar mensajes ----------
 class MultilineInputDialog(tk.Toplevel):
@@ -133,6 +65,7 @@ class MultilineInputDialog(tk.Toplevel):
         hint = ttk.Label(self, text="Escribe el mensaje tal como lo pegarías. Enter = salto de línea. Ctrl+Enter = Guardar.")
         hint.grid(row=0, column=0, sticky="w", padx=10, pady=(10, 6))
 
+        from tkinter.scrolledtext import ScrolledText
         self.text = ScrolledText(self, wrap="word", width=80, height=18)
         self.text.grid(row=1, column=0, sticky="nsew", padx=10)
         if initial_text:
@@ -177,28 +110,518 @@ def ask_multiline(parent, title, initial=""):
     dlg = MultilineInputDialog(parent, title=title, initial_text=initial)
     return dlg.result
 
+# ---------- Diálogo de campos de plantilla ----------
+class TemplateFieldsDialog(tk.Toplevel):
+    """
+    Diálogo modal con una caja por campo {{nombre}} del mensaje a pegar.
+    - Enter: Pegar
+    - Esc: Cancelar
+    """
+    def __init__(self, parent, fields, initial=None):
+        super().__init__(parent)
+        self.title("Completar campos")
+        self.attributes("-topmost", True)
+        self.resizable(False, False)
+        self.configure(padx=10, pady=10)
+        self.result = None
+
+        self.transient(parent)
+        self.grab_set()
+
+        self.vars = {}
+        for row, name in enumerate(fields):
+            ttk.Label(self, text=name).grid(row=row, column=0, sticky="w", padx=(0, 8), pady=2)
+            var = self.vars[name] = tk.StringVar(value=(initial or {}).get(name, ""))
+            entry = ttk.Entry(self, textvariable=var, width=50)
+            entry.grid(row=row, column=1, sticky="ew", pady=2)
+            if row == 0:
+                entry.focus_set()
+                entry.select_range(0, "end")
+
+        btns = ttk.Frame(self)
+        btns.grid(row=len(fields), column=0, columnspan=2, sticky="e", pady=(8, 0))
+        ttk.Button(btns, text="Pegar (Enter)", command=self.on_ok).pack(side="left", padx=(0,8))
+        ttk.Button(btns, text="Cancelar (Esc)", command=self.on_cancel).pack(side="left")
+
+        self.bind("<Return>", lambda e: self.on_ok())
+        self.bind("<Escape>", lambda e: self.on_cancel())
+
+        try:
+            x, y = self.winfo_pointerx(), self.winfo_pointery()
+            self.geometry(f"+{max(0, x-260)}+{max(0, y-80)}")
+        except:
+            pass
+
+        self.wait_window(self)
+
+    def on_ok(self):
+        self.result = {name: var.get() for name, var in self.vars.items()}
+        self.destroy()
+
+    def on_cancel(self):
+        self.result = None
+        self.destroy()
+
+def ask_fields(parent, fields, initial=None):
+    dlg = TemplateFieldsDialog(parent, fields, initial)
+    return dlg.result
+
+# ---------- UI: Búsqueda asíncrona ----------
+class SearchScheduler:
+    """
+    Búsqueda con debounce y en segundo plano:
+    - Las teclas se agrupan con after(): se busca cuando se deja de tipear delay_ms.
+    - La búsqueda corre en un hilo de trabajo sobre datos que no cambian mientras tanto.
+    - Cada pedido lleva un número de generación; los resultados viejos se descartan
+      y sólo el último vuelve al hilo de Tk.
+    """
+    def __init__(self, widget, delay_ms=SEARCH_DEBOUNCE_MS):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.generation = 0
+        self._after_id = None
+        self._pending = None          # (gen, job, on_done) aún no tomado por el worker
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, prepare, on_done):
+        """
+        prepare() corre en el hilo de Tk cuando vence el debounce: lee los filtros, toma
+        la foto de los datos y devuelve la función que el worker ejecuta.
+        on_done(resultado) corre en el hilo de Tk, sólo si nadie pidió otra búsqueda.
+        """
+        self.cancel()
+        self._after_id = self.widget.after(self.delay_ms, self._fire, self.generation, prepare, on_done)
+
+    def cancel(self):
+        """ Invalida lo pendiente o en curso (p.ej. antes de un refresco sincrónico). """
+        self.generation += 1
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def close(self):
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _fire(self, gen, prepare, on_done):
+        self._after_id = None
+        job = prepare()
+        with self._cond:
+            self._pending = (gen, job, on_done)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                gen, job, on_done = self._pending
+                self._pending = None
+            if gen != self.generation:
+                continue
+            try:
+                result = job()
+            except Exception:
+                continue
+            if gen == self.generation:
+                try:
+                    self.widget.after(0, self._deliver, gen, result, on_done)
+                except (RuntimeError, tk.TclError):
+                    # La ventana (o el mainloop) ya no existe
+                    pass
+
+    def _deliver(self, gen, result, on_done):
+        if gen == self.generation:
+            on_done(result)
+
+# ---------- UI: Tareas en segundo plano ----------
+class BackgroundJob:
+    """
+    Corre work(job) en un hilo para no congelar la ventana (importar, exportar).
+    Desde el hilo: job.progress(fracción) y job.call(fn, *args), que ejecuta fn en el hilo
+    de Tk y espera a que termine (así el trabajo no se adelanta a la UI).
+    on_progress, on_done(resultado) y on_error(excepción) corren en el hilo de Tk.
+    """
+    def __init__(self, widget, work, on_progress=None, on_done=None, on_error=None):
+        self.widget = widget
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+        self._progress = None       # último avance aún no mostrado
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(work,), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _post(self, fn, *args):
+        try:
+            self.widget.after(0, fn, *args)
+            return True
+        except (RuntimeError, tk.TclError):
+            # La ventana (o el mainloop) ya no existe
+            self.cancelled = True
+            return False
+
+    def progress(self, frac):
+        with self._lock:
+            # Se muestra sólo el último valor: no se encola un after() por cada aviso
+            first = self._progress is None
+            self._progress = frac
+        if first and self.on_progress:
+            self._post(self._show_progress)
+
+    def _show_progress(self):
+        with self._lock:
+            frac, self._progress = self._progress, None
+        if not self.cancelled and frac is not None:
+            self.on_progress(frac)
+
+    def call(self, fn, *args):
+        done = threading.Event()
+        box = {}
+        def run():
+            try:
+                box["result"] = fn(*args)
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+        if not self._post(run):
+            return None
+        while not done.wait(0.5):
+            if self.cancelled:
+                return None
+        if "error" in box:
+            raise box["error"]
+        return box.get("result")
+
+    def _run(self, work):
+        try:
+            result = work(self)
+        except Exception as e:
+            if self.on_error:
+                self._post(self.on_error, e)
+            return
+        if self.on_done and not self.cancelled:
+            self._post(self.on_done, result)
+
+# ---------- UI: Notificación de cambios ----------
+# Un cambio ya aplicado a la biblioteca: op y fields como en el journal (add, edit, del,
+# add_many, add_group, rename_group, del_group), o "reset"/"reload" cuando cambió todo.
+Change = namedtuple("Change", "version op fields")
+
+GROUP_OPS = {"add_group", "rename_group", "del_group"}   # cambian la lista de grupos
+
+def touched_groups(change):
+    """ Grupos cuyo contenido cambió (por nombre; el nuevo y el viejo si fue un renombre). """
+    return {change.fields[k] for k in ("g", "new") if k in change.fields}
+
+class ChangeBus:
+    """
+    Avisos de cambios para las ventanas. Cada publish() numera el cambio (version) y lo encola;
+    los suscriptores reciben la lista de cambios juntos una sola vez por ciclo ocioso de Tk
+    (after_idle), así una ráfaga de cambios (importación, cambios de otro proceso) cuesta un
+    solo refresco, y mirar la biblioteca sin cambiarla no refresca nada.
+    """
+    def __init__(self, widget):
+        self.widget = widget
+        self.version = 0
+        self._subscribers = []
+        self._pending = []
+        self._idle_id = None
+
+    def subscribe(self, fn):
+        """ fn(changes) corre en el hilo de Tk con los cambios desde la última entrega. """
+        self._subscribers.append(fn)
+
+    def unsubscribe(self, fn):
+        if fn in self._subscribers:
+            self._subscribers.remove(fn)
+
+    def publish(self, op, **fields):
+        self.version += 1
+        self._pending.append(Change(self.version, op, fields))
+        if self._idle_id is None:
+            self._idle_id = self.widget.after_idle(self._deliver)
+
+    def _deliver(self):
+        self._idle_id = None
+        changes, self._pending = self._pending, []
+        for fn in list(self._subscribers):
+            try:
+                fn(changes)
+            except tk.TclError:
+                pass    # la ventana se cerró mientras tanto
+
+# ---------- UI: Pegado ----------
+class PasteEngine:
+    """
+    Pega un texto en la app que tiene el foco, desde un hilo propio (el de Tk no espera):
+    guarda el portapapeles del usuario, copia el texto y relee hasta confirmar que quedó
+    (en vez de dormir un tiempo fijo), envía Ctrl+V y después devuelve el portapapeles anterior
+    si nadie copió otra cosa mientras tanto. Los pegados se encolan y corren de a uno.
+    Métricas: latencias (ms desde el pedido hasta Ctrl+V) y cantidad de pegados y fallas.
+    """
+    def __init__(self, widget, history=None):
+        self.widget = widget
+        self.history = history
+        self.latencies = deque(maxlen=50)
+        self.pasted = 0
+        self.failed = 0
+        self.restore_failed = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def paste(self, text, on_error=None):
+        """ Encola el pegado; on_error(mensaje) corre en el hilo de Tk si algo falla. """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put((time.perf_counter(), text, on_error))
+
+    def summary(self):
+        """ Resumen para mostrar (vacío si todavía no se pegó nada). """
+        if not self.pasted and not self.failed:
+            return ""
+        parts = []
+        if self.latencies:
+            parts.append(f"pegado en {self.latencies[-1]:.1f} ms (mediana {statistics.median(self.latencies):.1f} ms)")
+        parts.append(f"{self.pasted} pegado(s)")
+        if self.failed:
+            parts.append(f"{self.failed} fallido(s)")
+        if self.restore_failed:
+            parts.append(f"{self.restore_failed} sin restaurar el portapapeles")
+        return ", ".join(parts)
+
+    def _run(self):
+        while True:
+            t0, text, on_error = self._queue.get()
+            try:
+                self._paste(t0, text)
+            except Exception as e:
+                self.failed += 1
+                self._report(on_error, str(e))
+
+    def _paste(self, t0, text):
+        try:
+            # pyperclip devuelve "" si lo que hay no es texto (p.ej. una imagen): no se puede
+            # devolver, y copiar "" dejaría el portapapeles vacío. Tampoco se restaura.
+            previous = pyperclip.paste() or None
+        except Exception:
+            previous = None     # portapapeles ocupado o inaccesible: no se restaura
+        if self.history is not None:
+            self.history.skip(text)
+        pyperclip.copy(text)
+        if not self._wait_clipboard(text):
+            raise RuntimeError("El portapapeles no tomó el texto a tiempo; no se pegó.")
+        try:
+            keyboard.send("ctrl+v")
+        except Exception as e:
+            # Sin restaurar: el texto queda en el portapapeles para pegarlo a mano
+            raise RuntimeError(f"No pude simular Ctrl+V.\nQuedó copiado al portapapeles.\n{e}")
+        self.latencies.append((time.perf_counter() - t0) * 1000)
+        self.pasted += 1
+        if previous is None:
+            # El texto queda en el portapapeles: el watcher consume el skip al verlo (o vence solo)
+            return
+        if previous != text and not self._restore(text, previous):
+            return
+        if self.history is not None:
+            # Ya no está en el portapapeles (o estaba desde antes y el watcher no lo verá de nuevo):
+            # una copia real posterior de este texto tiene que entrar al historial
+            self.history.unskip(text)
+
+    def _wait_clipboard(self, text):
+        deadline = time.perf_counter() + PASTE_CONFIRM_TIMEOUT_MS / 1000
+        while True:
+            try:
+                if pyperclip.paste() == text:
+                    return True
+            except Exception:
+                pass
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(PASTE_CONFIRM_POLL_MS / 1000)
+
+    def _restore(self, text, previous):
+        # La otra app lee el portapapeles cuando procesa el Ctrl+V y no hay forma de saber
+        # cuándo terminó: se espera un margen (en este hilo, no en el de Tk)
+        time.sleep(PASTE_RESTORE_DELAY_MS / 1000)
+        try:
+            # Si el usuario copió otra cosa mientras tanto, eso gana
+            if pyperclip.paste() == text:
+                pyperclip.copy(previous)
+            return True
+        except Exception:
+            self.restore_failed += 1
+            return False
+
+    def _report(self, on_error, msg):
+        if on_error is None:
+            return
+        try:
+            self.widget.after(0, on_error, msg)
+        except (RuntimeError, tk.TclError):
+            pass
+
+# ---------- UI: Lista virtual ----------
+class VirtualListbox(ttk.Frame):
+    """
+    Listbox virtual: guarda la lista completa pero sólo materializa en el tk.Listbox
+    las filas visibles. Al cambiar los ítems se reescriben únicamente las filas
+    visibles que difieren de las que ya estaban.
+    Expone lo que usa el popup de un tk.Listbox: size, curselection, select_set, bind.
+    """
+    def __init__(self, parent, height=12, **kw):
+        super().__init__(parent)
+        self.height = height
+        self.items = []
+        self.top = 0            # índice del primer ítem visible
+        self.selected = None    # índice (en items) seleccionado
+        self._rows = []         # textos que hay hoy en el tk.Listbox
+
+        self.listbox = tk.Listbox(self, height=height, exportselection=False, **kw)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        # La navegación se resuelve sobre la lista virtual, no sobre las filas visibles
+        self.listbox.bind("<Up>", lambda e: self._move(-1))
+        self.listbox.bind("<Down>", lambda e: self._move(1))
+        self.listbox.bind("<Prior>", lambda e: self._move(-self.height))
+        self.listbox.bind("<Next>", lambda e: self._move(self.height))
+        self.listbox.bind("<Home>", lambda e: self._move(-len(self.items)))
+        self.listbox.bind("<End>", lambda e: self._move(len(self.items)))
+        self.listbox.bind("<MouseWheel>", lambda e: self._scroll(-3 if e.delta > 0 else 3))
+        self.listbox.bind("<Button-4>", lambda e: self._scroll(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll(3))
+        self.listbox.bind("<<ListboxSelect>>", self._on_click)
+
+    # ---- API tipo Listbox ----
+    def bind(self, sequence=None, func=None, add=None):
+        return self.listbox.bind(sequence, func, add)
+
+    def focus_set(self):
+        self.listbox.focus_set()
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def select_set(self, index):
+        if 0 <= index < len(self.items):
+            self.selected = index
+            self._ensure_visible(index)
+            self._render()
+
+    def set_items(self, items):
+        """ Reemplaza la lista completa; vuelve al principio y selecciona la primera fila. """
+        self.items = items
+        self.top = 0
+        self.selected = 0 if items else None
+        self._render()
+
+    # ---- internos ----
+    def _max_top(self):
+        return max(0, len(self.items) - self.height)
+
+    def _ensure_visible(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.height:
+            self.top = index - self.height + 1
+        self.top = min(max(0, self.top), self._max_top())
+
+    def _move(self, delta):
+        if self.items:
+            cur = 0 if self.selected is None else self.selected
+            self.selected = min(max(0, cur + delta), len(self.items) - 1)
+            self._ensure_visible(self.selected)
+            self._render()
+        return "break"
+
+    def _scroll(self, delta):
+        self.top = min(max(0, self.top + delta), self._max_top())
+        self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.items))
+        elif unit == "pages":
+            self.top += int(amount) * self.height
+        else:
+            self.top += int(amount)
+        self.top = min(max(0, self.top), self._max_top())
+        self._render()
+
+    def _on_click(self, event=None):
+        idxs = self.listbox.curselection()
+        if idxs:
+            self.selected = self.top + idxs[0]
+
+    def _render(self):
+        rows = self.items[self.top:self.top + self.height]
+        old = self._rows
+        lb = self.listbox
+        # Diff fila a fila contra lo que ya está materializado
+        for i, text in enumerate(rows):
+            if i >= len(old):
+                lb.insert(tk.END, text)
+            elif old[i] != text:
+                lb.delete(i)
+                lb.insert(i, text)
+        if len(old) > len(rows):
+            lb.delete(len(rows), tk.END)
+        self._rows = rows
+
+        lb.selection_clear(0, tk.END)
+        if self.selected is not None and self.top <= self.selected < self.top + len(rows):
+            lb.selection_set(self.selected - self.top)
+            lb.activate(self.selected - self.top)
+        n = len(self.items)
+        if n:
+            self.scrollbar.set(self.top / n, (self.top + len(rows)) / n)
+        else:
+            self.scrollbar.set(0, 1)
+
 # ---------- UI: Popup de pegado rápido ----------
 class Popup(tk.Toplevel):
-    def __init__(self, app):
+    def __init__(self, app, standby=False):
         super().__init__(app)
         self.app = app
+        # En modo standby la ventana vive oculta y close() sólo la esconde
+        self.standby = standby
+        if standby:
+            self.withdraw()
+            # La X de la ventana también sólo la esconde (si no, queda destruida y referenciada)
+            self.protocol("WM_DELETE_WINDOW", self.close)
         self.title("Clipboard Buddy")
         self.attributes("-topmost", True)
         self.resizable(False, False)
         self.configure(padx=10, pady=10)
 
-        # Posición cerca del puntero
-        try:
-            x, y = self.winfo_pointerx(), self.winfo_pointery()
-            self.geometry(f"+{max(0, x-320)}+{max(0, y-240)}")
-        except:
-            pass
+        self.place_near_pointer()
 
         # Grupo
         tk.Label(self, text="Grupo").grid(row=0, column=0, sticky="w")
         self.group_var = tk.StringVar()
         self.group_combo = ttk.Combobox(self, textvariable=self.group_var, state="readonly",
-                                        values=all_group_names(self.app.data), width=40)
+                                        values=self.group_names(), width=40)
         self.group_combo.grid(row=1, column=0, columnspan=3, sticky="ew", pady=(0,6))
         self.group_combo.bind("<<ComboboxSelected>>", self.refresh_list)
 
@@ -207,10 +630,11 @@ class Popup(tk.Toplevel):
         self.search_var = tk.StringVar()
         self.search_entry = ttk.Entry(self, textvariable=self.search_var, width=45)
         self.search_entry.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(0,6))
-        self.search_entry.bind("<KeyRelease>", self.refresh_list)
+        self.search = SearchScheduler(self)
+        self.search_entry.bind("<KeyRelease>", lambda e: self.schedule_refresh())
 
         # Lista mensajes
-        self.listbox = tk.Listbox(self, width=60, height=12, activestyle="dotbox")
+        self.listbox = VirtualListbox(self, width=60, height=12, activestyle="dotbox")
         self.listbox.grid(row=4, column=0, columnspan=3, sticky="nsew")
         self.listbox.bind("<Return>", lambda e: self.paste_selected())
         self.listbox.bind("<Escape>", lambda e: self.close())
@@ -223,56 +647,160 @@ class Popup(tk.Toplevel):
         manage_btn.grid(row=5, column=1, pady=8, sticky="ew")
         cancel_btn.grid(row=5, column=2, pady=8, sticky="ew")
 
+        # Latencia hotkey -> ventana visible
+        self.latency_var = tk.StringVar()
+        tk.Label(self, textvariable=self.latency_var, fg="gray").grid(row=6, column=0, columnspan=3, sticky="w")
+
         # Accesos
         self.bind("<Escape>", lambda e: self.close())
 
-        # Datos de lista actual [(display, text)]
+        # Datos de lista actual [(display, Snippet)]
         self.current_items = []
+        self._stale = False         # oculto y con cambios sin reflejar (ver on_changes)
+        self._stale_id = None
+        self._history_version = None    # history.version del último listado del historial
         # Inicializa
         self.group_combo.current(0)
         self.refresh_list()
         self.search_entry.focus_set()
 
-        # Registra popup en la app para poder refrescar desde el gestor
-        self.app.register_popup(self)
+        # Se entera de los cambios de la biblioteca (gestor, otros procesos) por el bus
+        self.app.bus.subscribe(self.on_changes)
 
     def destroy(self):
-        self.app.unregister_popup(self)
+        self.app.bus.unsubscribe(self.on_changes)
+        if self._stale_id is not None:
+            self.after_cancel(self._stale_id)
+        self.search.close()
         super().destroy()
 
-    def current_items_for_group(self):
-        g = self.group_var.get()
-        q = self.search_var.get().strip().lower()
+    def place_near_pointer(self):
+        # Posición cerca del puntero
+        try:
+            x, y = self.winfo_pointerx(), self.winfo_pointery()
+            self.geometry(f"+{max(0, x-320)}+{max(0, y-240)}")
+        except:
+            pass
+
+    def show(self):
+        """ Muestra el popup (ya armado y filtrado) cerca del puntero. """
+        if self.group_var.get() == VIRTUAL_HISTORY and self._history_version != self.app.history.version:
+            self._stale = True      # se copió algo mientras estaba oculto
+        self._refresh_if_stale()
+        self.place_near_pointer()
+        self.deiconify()
+        self.lift()
+        try:
+            self.focus_force()
+        except:
+            pass
+        self.search_entry.focus_set()
+
+    def reset(self):
+        """ Vuelve al estado inicial (todos los grupos, sin filtro) para la próxima apertura. """
+        self.search_var.set("")
+        self.group_combo.current(0)
+        self.refresh_list()
+
+    def group_names(self):
+        """ Grupos del combo: los dos virtuales (todos, historial) y después los de la biblioteca. """
+        names = all_group_names(self.app.data)
+        names.insert(1, VIRTUAL_HISTORY)
+        return names
+
+    def current_items_for_group(self, g=None, q=None):
+        """ Ítems (display, Snippet) del filtro actual. Puede correr fuera del hilo de Tk si se pasan g y q. """
+        if g is None:
+            g = self.group_var.get()
+        if q is None:
+            q = self.search_var.get().strip().lower()
+        if g == VIRTUAL_HISTORY:
+            self._history_version = self.app.history.version
+            return [(e.display, e) for e in self.app.history.entries(q)]
 
         items = []
-        if g == VIRTUAL_ALL:
-            for grp, msg in all_messages_pairs(self.app.data):
-                # En la lista mostramos una sola línea (para no romper el listbox);
-                # los saltos de línea se reemplazan por ⏎ para indicarlo visualmente.
-                disp = f"[{grp}] " + (msg.replace("\r\n", "\n").replace("\r", "\n").replace("\n", " ⏎ "))
-                if not q or (q in msg.lower() or q in grp.lower()):
-                    items.append((disp, msg))
-        else:
-            msgs = self.app.data.get(g, [])
-            for msg in msgs:
-                disp = msg.replace("\r\n", "\n").replace("\r", "\n").replace("\n", " ⏎ ")
-                if not q or q in msg.lower():
-                    items.append((disp, msg))
+        index = self.app.index
+        usage = self.app.usage
+
+        def compute():
+            # Sin filtro: todo, los más usados primero; con filtro: rankeado (uso incluido)
+            boost = usage.boosts(index)
+            if q:
+                return index.search_ranked(g, q, boost=boost)
+            return by_frecency(index.search(g, q), boost)
+
+        def refine(prev, prev_ids):
+            return index.refine_ranked(g, q, prev, prev_ids, boost=usage.boosts(index))
+
+        data = self.app.data
+        with index.lock:
+            docs = index.docs
+            # Es el lock de la biblioteca: la versión corresponde exactamente a lo que hay en el índice
+            version = (data.version if g == VIRTUAL_ALL else data.group_version(g), usage.version)
+            ids = self.app.query_cache.get(g, q, version, compute, refine)
+            if g == VIRTUAL_ALL:
+                for doc_id in ids:
+                    grp, snip = docs[doc_id]
+                    items.append((f"[{grp}] " + snip.display, snip))
+            else:
+                for doc_id in ids:
+                    snip = docs[doc_id][1]
+                    items.append((snip.display, snip))
         return items
 
+    def schedule_refresh(self):
+        """ Refresco por tecleo: con debounce y en segundo plano. """
+        self.search.schedule(self._prepare_search, self._show_items)
+
+    def _prepare_search(self):
+        g = self.group_var.get()
+        q = self.search_var.get().strip().lower()
+        return lambda: self.current_items_for_group(g, q)
+
     def refresh_list(self, *args):
         # Actualiza valores de grupos
-        self.group_combo["values"] = all_group_names(self.app.data)
+        self.group_combo["values"] = self.group_names()
         if self.group_var.get() not in self.group_combo["values"]:
             self.group_var.set(VIRTUAL_ALL)
 
-        # Rellena listbox
-        self.current_items = self.current_items_for_group()
-        self.listbox.delete(0, tk.END)
-        for disp, _ in self.current_items:
-            self.listbox.insert(tk.END, disp)
-        if self.listbox.size() > 0:
-            self.listbox.select_set(0)
+        # Un refresco sincrónico deja sin efecto cualquier búsqueda pendiente
+        self.search.cancel()
+        self._show_items(self.current_items_for_group())
+
+    def on_changes(self, changes):
+        """
+        Suscriptor del bus: vuelve a filtrar sólo si el grupo que se está viendo cambió, y en
+        segundo plano (como al teclear). Oculto (standby) sólo se marca: se filtra una vez cuando
+        la ráfaga de cambios se calma, o al mostrarlo; una importación no relista por lote.
+        """
+        if not self.winfo_viewable():
+            self._stale = True
+            if self._stale_id is not None:
+                self.after_cancel(self._stale_id)
+            self._stale_id = self.after(STANDBY_REFRESH_MS, self._refresh_if_stale)
+            return
+        listed = set(self.group_combo["values"])
+        if any(c.op in GROUP_OPS or c.op in FULL_OPS or c.fields.get("g") not in listed for c in changes):
+            # Cambió la lista de grupos (agregar a un grupo nuevo también lo crea)
+            self.group_combo["values"] = self.group_names()
+        g = self.group_var.get()
+        if g not in self.group_combo["values"]:
+            self.refresh_list()     # el grupo elegido ya no existe: vuelve a todos
+        elif g == VIRTUAL_HISTORY:
+            return
+        elif g == VIRTUAL_ALL or any(c.op in FULL_OPS or g in touched_groups(c) for c in changes):
+            self.schedule_refresh()
+
+    def _refresh_if_stale(self):
+        self._stale_id = None
+        if self._stale:
+            self._stale = False
+            self.refresh_list()
+
+    def _show_items(self, items):
+        # Rellena la lista (sólo se dibujan las filas visibles)
+        self.current_items = items
+        self.listbox.set_items([disp for disp, _ in items])
 
     def paste_selected(self):
         if self.listbox.size() == 0:
@@ -281,24 +809,52 @@ class Popup(tk.Toplevel):
         idxs = self.listbox.curselection()
         if not idxs:
             idxs = (0,)
-        _, text = self.current_items[idxs[0]]
+        _, snip = self.current_items[idxs[0]]
+        text = self.fill_template(snip)
+        if text is None:
+            return  # canceló el diálogo de campos: el popup sigue abierto
+        if not isinstance(snip, HistoryEntry):
+            self.app.usage.record(snip.key)
 
-        # Ocultar para devolver foco a la app anterior
+        # Ocultar para devolver foco a la app anterior; el resto corre en el hilo de pegado
         self.withdraw()
         self.update_idletasks()
-        pyperclip.copy(text)
-        time.sleep(0.05)
-        try:
-            keyboard.send("ctrl+v")
-        except Exception as e:
-            messagebox.showwarning("Clipboard Buddy", f"No pude simular Ctrl+V.\nQuedó copiado al portapapeles.\n{e}")
+        self.app.paste_engine.paste(text, on_error=self.app.paste_failed)
         self.close()
 
+    def fill_template(self, snip):
+        """
+        Texto a pegar. Si el mensaje tiene campos {{nombre}} (compilados al cargar) se completan:
+        {{portapapeles}} con lo que haya copiado, el resto con un diálogo que recuerda lo último usado.
+        None si el usuario canceló.
+        """
+        tpl = snip.template
+        if tpl is None:
+            return snip.raw
+        values = {}
+        if CLIPBOARD_FIELD in tpl.fields:
+            try:
+                values[CLIPBOARD_FIELD] = pyperclip.paste()
+            except Exception:
+                values[CLIPBOARD_FIELD] = ""
+        if tpl.prompted:
+            filled = ask_fields(self, tpl.prompted, self.app.field_values)
+            if filled is None:
+                return None
+            self.app.field_values.update(filled)
+            values.update(filled)
+        return tpl.render(values)
+
     def open_manager(self):
         self.app.open_manager()
 
     def close(self):
-        self.destroy()
+        if self.standby:
+            # Se esconde y se deja filtrado de antemano para la próxima vez
+            self.withdraw()
+            self.reset()
+        else:
+            self.destroy()
 
 # ---------- UI: Gestor de grupos y mensajes ----------
 class ManagerWindow(tk.Toplevel):
@@ -311,6 +867,10 @@ class ManagerWindow(tk.Toplevel):
         self.configure(padx=10, pady=10)
         self.resizable(True, True)
 
+        # Filas de los listbox -> ids (grupo) y (posición, id) de mensaje
+        self._group_rows = []
+        self._message_rows = []
+
         # Info virtual
         info = ttk.Label(self, text=f"Nota: '{VIRTUAL_ALL}' es un grupo virtual con todos los mensajes (se ve en el menú rápido).")
         info.grid(row=0, column=0, columnspan=3, sticky="w", pady=(0,8))
@@ -346,7 +906,8 @@ class ManagerWindow(tk.Toplevel):
         msg_search = ttk.Entry(msg_frame, textvariable=self.msg_search_var)
         msg_search.grid(row=0, column=1, sticky="ew", padx=6, pady=6)
         msg_frame.columnconfigure(1, weight=1)
-        msg_search.bind("<KeyRelease>", lambda e: self.refresh_messages())
+        self.search = SearchScheduler(self)
+        msg_search.bind("<KeyRelease>", lambda e: self.schedule_refresh_messages())
 
         self.messages_list = tk.Listbox(msg_frame, width=50, height=16, activestyle="dotbox")
         self.messages_list.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=6)
@@ -361,13 +922,19 @@ class ManagerWindow(tk.Toplevel):
         # Botones Import/Export
         io_frame = ttk.Frame(self)
         io_frame.grid(row=2, column=0, columnspan=3, sticky="ew", pady=(8,0))
-        export_btn = ttk.Button(io_frame, text="Exportar CSV…", command=self.export_csv)
-        import_btn = ttk.Button(io_frame, text="Importar CSV…", command=self.import_csv)
-        export_btn.pack(side="left", padx=(0,8))
-        import_btn.pack(side="left")
+        self.export_btn = ttk.Button(io_frame, text="Exportar CSV…", command=self.export_csv)
+        self.import_btn = ttk.Button(io_frame, text="Importar CSV…", command=self.import_csv)
+        self.export_btn.pack(side="left", padx=(0,8))
+        self.import_btn.pack(side="left")
+        # Avance de importación/exportación (visible sólo mientras corre)
+        self.io_progress = ttk.Progressbar(io_frame, maximum=1.0, length=160)
+        self.io_status = tk.StringVar(value="")
+        self.io_label = ttk.Label(io_frame, textvariable=self.io_status, foreground="#666")
+        self._io_job = None
 
         # Eventos
         self.groups_list.bind("<<ListboxSelect>>", lambda e: self.refresh_messages())
+        self.app.bus.subscribe(self.on_changes)
 
         # Carga inicial
         self.refresh_groups()
@@ -380,45 +947,112 @@ class ManagerWindow(tk.Toplevel):
         idxs = self.groups_list.curselection()
         if not idxs:
             return None
-        names = sorted([g for g in self.app.data.keys() if g != VIRTUAL_ALL], key=lambda s: s.lower())
-        if 0 <= idxs[0] < len(names):
-            return names[idxs[0]]
+        # Cada fila del listbox apunta al id del grupo
+        if 0 <= idxs[0] < len(self._group_rows):
+            return self.app.groups.names.get(self._group_rows[idxs[0]])
         return None
 
+    def select_group(self, gid):
+        try:
+            idx = self._group_rows.index(gid)
+        except ValueError:
+            return
+        self.groups_list.select_clear(0, tk.END)
+        self.groups_list.select_set(idx)
+        self.refresh_messages()
+
+    def on_changes(self, changes):
+        """ Suscriptor del bus: relista los grupos sólo si cambiaron, y los mensajes sólo si es el grupo elegido. """
+        reloaded = any(c.op in FULL_OPS for c in changes)
+        listed = set(self._group_rows)
+        groups_changed = reloaded or any(
+            c.op in GROUP_OPS or self.app.groups.by_name.get(c.fields.get("g")) not in listed
+            for c in changes)
+        g = self.get_selected_group()
+        if groups_changed:
+            self.reload_view(reloaded)
+        elif g is not None and any(g in touched_groups(c) for c in changes):
+            self.reload_view(groups=False)
+
+    def reload_view(self, reloaded=False, groups=True):
+        """ Tras cambios: relista conservando el grupo (por id) y la fila elegida. """
+        idxs = self.groups_list.curselection()
+        gid = self._group_rows[idxs[0]] if idxs and idxs[0] < len(self._group_rows) else None
+        name = self.get_selected_group()
+        rows = self.messages_list.curselection()
+        if not groups:
+            self.refresh_messages()
+        else:
+            self.refresh_groups()
+            if reloaded:
+                # Los ids de grupo se regeneraron: se busca por nombre
+                gid = self.app.groups.by_name.get(name)
+            if gid is not None and gid in self.app.groups.names:
+                self.select_group(gid)
+            else:
+                self.refresh_messages()
+        if rows and rows[0] < self.messages_list.size():
+            self.messages_list.select_set(rows[0])
+            self.messages_list.see(rows[0])
+
     def refresh_groups(self):
+        # Sin filtrar VIRTUAL_HISTORY: un grupo real con ese nombre (anterior a reservarlo) sólo
+        # se ve acá, y así se puede renombrar
+        names = sorted([g for g in self.app.data.keys() if g != VIRTUAL_ALL], key=lambda s: s.lower())
+        self._group_rows = [self.app.groups.by_name[g] for g in names]
         self.groups_list.delete(0, tk.END)
-        for g in sorted([g for g in self.app.data.keys() if g != VIRTUAL_ALL], key=lambda s: s.lower()):
-            self.groups_list.insert(tk.END, g)
-        self.app.refresh_all_popups()
+        if names:
+            self.groups_list.insert(tk.END, *names)
 
     def refresh_messages(self):
+        self.search.cancel()
         self.messages_list.delete(0, tk.END)
+        self._message_rows = []
         g = self.get_selected_group()
         if not g:
             return
         msgs = self.app.data.get(g, [])
         q = self.msg_search_var.get().strip().lower()
-        for m in msgs:
-            if not q or q in m.lower():
-                # Mostrar indicadores de salto de línea en la lista
-                disp = m.replace("\r\n", "\n").replace("\r", "\n").replace("\n", " ⏎ ")
-                self.messages_list.insert(tk.END, disp)
-        self.app.refresh_all_popups()
+        self._show_messages(self.app.index.message_rows(msgs, g, q))
+
+    def schedule_refresh_messages(self):
+        """ Filtro por tecleo: con debounce y en segundo plano (los datos no cambian). """
+        self.search.schedule(self._prepare_message_search, self._show_messages)
+
+    def _prepare_message_search(self):
+        g = self.get_selected_group()
+        q = self.msg_search_var.get().strip().lower()
+        # Foto inmutable del grupo: los Snippet no se modifican, se reemplazan al editar
+        snap = tuple(self.app.data.get(g, ())) if g else ()
+        index = self.app.index
+        return lambda: index.message_rows(snap, g, q)
+
+    def _show_messages(self, rows):
+        # rows: [(posición en el grupo, Snippet.id, display)]
+        self._message_rows = rows
+        self.messages_list.delete(0, tk.END)
+        if rows:
+            # Mostrar indicadores de salto de línea en la lista
+            self.messages_list.insert(tk.END, *(disp for _, _, disp in rows))
 
+    def destroy(self):
+        self.app.bus.unsubscribe(self.on_changes)
+        self.search.close()
+        super().destroy()
+
+    # Los cambios pasan por los métodos de app.data (Library); las listas se actualizan al recibirlos del bus
     def add_group(self):
         name = simpledialog.askstring("Nuevo grupo", "Nombre del grupo:", parent=self)
         if not name:
             return
         name = name.strip()
-        if not name or name == VIRTUAL_ALL:
+        if not name or is_virtual(name):
             messagebox.showerror("Error", f"Nombre inválido.")
             return
         if name in self.app.data:
             messagebox.showerror("Error", "Ya existe un grupo con ese nombre.")
             return
-        self.app.data[name] = []
-        save_data(self.app.data)
-        self.refresh_groups()
+        self.app.data.add_group(name)
 
     def rename_group(self):
         g = self.get_selected_group()
@@ -429,26 +1063,16 @@ class ManagerWindow(tk.Toplevel):
         if not new:
             return
         new = new.strip()
-        if not new or new == VIRTUAL_ALL:
+        if not new or is_virtual(new):
             messagebox.showerror("Error", "Nombre inválido.")
             return
         if new in self.app.data and new != g:
             messagebox.showerror("Error", "Ya existe un grupo con ese nombre.")
             return
-        if new == g:
+        if new == g or not self._still_there(g):
             return
-        self.app.data[new] = self.app.data.pop(g)
-        save_data(self.app.data)
-        self.refresh_groups()
-        # Seleccionar el nuevo
-        names = sorted([x for x in self.app.data.keys() if x != VIRTUAL_ALL], key=lambda s: s.lower())
-        try:
-            idx = names.index(new)
-            self.groups_list.select_clear(0, tk.END)
-            self.groups_list.select_set(idx)
-            self.refresh_messages()
-        except:
-            pass
+        # El grupo conserva su id: la selección sigue en él con el nombre nuevo
+        self.app.data.rename_group(g, new)
 
     def delete_group(self):
         g = self.get_selected_group()
@@ -457,10 +1081,25 @@ class ManagerWindow(tk.Toplevel):
             return
         if not messagebox.askyesno("Confirmar", f"¿Eliminar el grupo '{g}' y todos sus mensajes?"):
             return
-        self.app.data.pop(g, None)
-        save_data(self.app.data)
+        if not self._still_there(g):
+            return
+        self.app.data.delete_group(g)
+
+    def _still_there(self, g, pos=None, old=None):
+        """
+        Tras un diálogo: otro proceso pudo cambiar la biblioteca mientras tanto.
+        Devuelve la posición actual del mensaje (o True si sólo se pidió el grupo); None/False si ya no está.
+        """
+        msgs = self.app.data.get(g)
+        if msgs is not None and pos is None:
+            return True
+        found = locate_message(msgs, pos, old) if msgs is not None else None
+        if found is not None:
+            return found
+        messagebox.showinfo("Atención", "Se modificó desde otra ventana o proceso; se actualiza la lista.")
         self.refresh_groups()
         self.refresh_messages()
+        return None if pos is not None else False
 
     def _selected_message_raw(self):
         """ Devuelve el mensaje original (no la versión con '⏎ ') según selección. """
@@ -468,20 +1107,15 @@ class ManagerWindow(tk.Toplevel):
         if not g:
             return None, None, None
         idxs = self.messages_list.curselection()
-        if not idxs:
-            return g, None, None
-        # Reconstruimos el mensaje comparando contra la lista original del grupo,
-        # porque en el listbox mostramos ' ⏎ ' en vez de '\n'.
-        displayed = self.messages_list.get(idxs[0])
-        candidates = self.app.data.get(g, [])
-        for i, original in enumerate(candidates):
-            if displayed == original.replace("\r\n", "\n").replace("\r", "\n").replace("\n", " ⏎ "):
-                return g, i, original
-        # Si no encontramos coincidencia (poco probable), usamos el índice directo como fallback.
-        try:
-            return g, idxs[0], candidates[idxs[0]]
-        except:
+        if not idxs or idxs[0] >= len(self._message_rows):
             return g, None, None
+        # Cada fila sabe su posición y el id del Snippet: sin comparar textos,
+        # y correcto aunque haya mensajes repetidos
+        pos, sid, _ = self._message_rows[idxs[0]]
+        msgs = self.app.data.get(g, [])
+        if pos < len(msgs) and msgs[pos].id == sid:
+            return g, pos, msgs[pos].raw
+        return g, None, None
 
     def add_message(self):
         g = self.get_selected_group()
@@ -489,14 +1123,14 @@ class ManagerWindow(tk.Toplevel):
             messagebox.showinfo("Atención", "Seleccioná un grupo.")
             return
         text = ask_multiline(self, title="Agregar mensaje", initial="")
-        if text is None:
+        if text is None or not self._still_there(g):
             return
-        if text in self.app.data[g]:
+        # Por huella: con SQLite los textos no están en memoria (ver LazySnippet)
+        key = snippet_key(text)
+        if any(s.key == key for s in self.app.data[g]):
             if not messagebox.askyesno("Duplicado", "Ese mensaje ya existe en el grupo. ¿Agregar de todos modos?"):
                 return
-        self.app.data[g].append(text)
-        save_data(self.app.data)
-        self.refresh_messages()
+        self.app.data.add(g, text)
 
     def edit_message(self):
         g, pos, old = self._selected_message_raw()
@@ -509,9 +1143,10 @@ class ManagerWindow(tk.Toplevel):
         new = ask_multiline(self, title="Editar mensaje", initial=old)
         if new is None:
             return
-        self.app.data[g][pos] = new
-        save_data(self.app.data)
-        self.refresh_messages()
+        pos = self._still_there(g, pos, old)
+        if pos is None:
+            return
+        self.app.data.edit(g, pos, new)
 
     def delete_message(self):
         g, pos, old = self._selected_message_raw()
@@ -523,32 +1158,64 @@ class ManagerWindow(tk.Toplevel):
             return
         if not messagebox.askyesno("Confirmar", "¿Eliminar el mensaje seleccionado?"):
             return
+        pos = self._still_there(g, pos, old)
+        if pos is None:
+            return
         try:
-            del self.app.data[g][pos]
-            save_data(self.app.data)
-            self.refresh_messages()
+            self.app.data.delete(g, pos)
         except Exception:
             pass
 
     def export_csv(self):
+        g = self.get_selected_group()
+        q = self.msg_search_var.get().strip().lower()
+        subset = False
+        if g:
+            what = f"el grupo «{g}»" + (f" filtrado por «{q}»" if q else "")
+            subset = messagebox.askyesnocancel(
+                "Exportar",
+                f"¿Exportar sólo {what}?\n(Sí = sólo eso, No = todo)"
+            )
+            if subset is None:
+                return
         file = filedialog.asksaveasfilename(
-            title="Exportar a CSV",
+            title="Exportar",
             defaultextension=".csv",
-            filetypes=[("CSV", "*.csv")],
+            filetypes=[("CSV", "*.csv"), ("CSV comprimido", "*.csv.gz"),
+                       ("JSONL", "*.jsonl"), ("JSONL comprimido", "*.jsonl.gz")],
             initialfile="snippets.csv"
         )
         if not file:
             return
-        try:
-            export_to_csv(self.app.data, file)
-            messagebox.showinfo("Exportación", "Exportado correctamente.")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo exportar.\n{e}")
+
+        from clipbuddy_core.transfer import iter_export_rows, iter_doc_rows, export_rows
+
+        # Foto de las listas (referencias, no copias de los textos); se escribe en un hilo
+        index = self.app.index
+        if subset and q:
+            with index.lock:
+                ids = index.search(g, q)
+            rows, total = iter_doc_rows(index, ids), len(ids)
+        else:
+            snap = {name: tuple(msgs) for name, msgs in self.app.data.items()
+                    if not subset or name == g}
+            rows, total = iter_export_rows(snap), sum(map(len, snap.values()))
+
+        def work(job):
+            return export_rows(rows, file, progress=job.progress, total=total)
+
+        def done(n):
+            self._end_io_job()
+            messagebox.showinfo("Exportación", f"Exportado correctamente ({n} mensajes).")
+
+        self._start_io_job("Exportando…", work, done,
+                           lambda e: self._io_failed("No se pudo exportar.", e))
 
     def import_csv(self):
         file = filedialog.askopenfilename(
             title="Importar CSV",
-            filetypes=[("CSV", "*.csv")]
+            filetypes=[("CSV", "*.csv"), ("CSV comprimido", "*.csv.gz"),
+                       ("JSONL", "*.jsonl"), ("JSONL comprimido", "*.jsonl.gz")]
         )
         if not file:
             return
@@ -556,54 +1223,287 @@ class ManagerWindow(tk.Toplevel):
             "Importar CSV",
             "¿Reemplazar completamente los datos actuales?\n(Sí = reemplazar, No = fusionar)"
         )
-        try:
-            new_data = import_from_csv(file, self.app.data, replace=replace)
-            self.app.data.clear()
-            self.app.data.update(new_data)
-            save_data(self.app.data)
-            self.refresh_groups()
-            self.refresh_messages()
-            messagebox.showinfo("Importación", "Importado correctamente.")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo importar.\n{e}")
+        from clipbuddy_core.transfer import import_csv_batches
+
+        # Foto de las listas actuales (sólo referencias); las huellas para descartar repetidos
+        # se calculan en el hilo (con SQLite ya están en memoria: no se leen los textos)
+        current = {} if replace else {g: list(msgs) for g, msgs in self.app.data.items()}
+
+        def work(job):
+            added = 0
+            batches = import_csv_batches(file, current, replace=replace, progress=job.progress)
+            if replace:
+                # Reemplazo: se arma completo y se cambia de una vez (si falla, no se toca nada)
+                new_data = {}
+                for batch in batches:
+                    if job.cancelled:
+                        return added
+                    for g, msgs in batch.items():
+                        new_data.setdefault(g, []).extend(msgs)
+                        added += len(msgs)
+                job.call(self.app.data.replace, wrap_data(new_data))
+            else:
+                # Fusión: cada lote se confirma por separado (una entrada de journal por grupo)
+                for batch in batches:
+                    if job.cancelled:
+                        break
+                    job.call(self._commit_import_batch, batch)
+                    added += sum(map(len, batch.values()))
+            return added
+
+        self._start_io_job("Importando…", work, self._import_done,
+                           lambda e: self._io_failed("No se pudo importar.", e))
+
+    def _commit_import_batch(self, batch):
+        for g, msgs in batch.items():
+            self.app.data.add_many(g, msgs)
+
+    def _import_done(self, added):
+        self._end_io_job()
+        if not self.winfo_exists():
+            return
+        messagebox.showinfo("Importación", f"Importado correctamente ({added} mensajes nuevos).")
+
+    def _start_io_job(self, title, work, on_done, on_error):
+        self.import_btn.state(["disabled"])
+        self.export_btn.state(["disabled"])
+        self.io_progress["value"] = 0
+        self.io_status.set(title)
+        self.io_progress.pack(side="left", padx=(12,4))
+        self.io_label.pack(side="left")
+        def show(frac):
+            if self.winfo_exists():
+                self.io_progress["value"] = frac
+                self.io_status.set(f"{title} {frac:.0%}")
+        # El hilo le habla a la App: la tarea sigue aunque se cierre el gestor
+        self._io_job = BackgroundJob(self.app, work, show, on_done, on_error)
+
+    def _end_io_job(self):
+        self._io_job = None
+        if self.winfo_exists():
+            self.io_progress.pack_forget()
+            self.io_label.pack_forget()
+            self.import_btn.state(["!disabled"])
+            self.export_btn.state(["!disabled"])
+
+    def _io_failed(self, msg, e):
+        self._end_io_job()
+        messagebox.showerror("Error", f"{msg}\n{e}")
 
 # ---------- App principal ----------
+class StartupProfile:
+    """ Tiempos por fase del arranque (--profile-startup), desde que empezó a correr el script. """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.marks = []             # (instante, fase); se marcan desde varios hilos
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        if self.enabled:
+            with self._lock:
+                self.marks.append((time.perf_counter(), phase))
+
+    def report(self):
+        lines = [f"{'fase':28} {'desde inicio':>12} {'duración':>10}"]
+        prev = _T0
+        for t, phase in sorted(self.marks):
+            lines.append(f"{phase:28} {(t - _T0) * 1000:9.1f} ms {(t - prev) * 1000:7.1f} ms")
+            prev = t
+        return "\n".join(lines)
+
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, profile=None):
+        self.profile = profile or StartupProfile()
         super().__init__()
         self.withdraw()  # correr en "segundo plano"
-        self.data = load_data()
+        self.profile.mark("ventana raíz (Tk)")
+        self.loaded = False
+        self._after_load = []       # lo pedido por hotkey antes de terminar la carga
 
-        self._popups = set()
+        self.bus = ChangeBus(self)  # avisa a las ventanas qué cambió en la biblioteca
         self._manager = None
-
-        # Hotkeys globales
+        self.popup_latencies = deque(maxlen=50)   # ms desde el hotkey hasta ver el popup
+        self._standby_popup = None
+        self.field_values = {}      # último valor usado por campo de plantilla (sólo en la sesión)
+        self.query_cache = QueryCache()   # resultados del popup por (grupo, consulta, versión)
+
+        # Historial del portapapeles: un hilo mira si cambió y lo guarda en un buffer acotado
+        self.history = ClipboardHistory()
+        self._closing = threading.Event()
+        self.history_thread = threading.Thread(target=self._watch_clipboard, daemon=True)
+        self.history_thread.start()
+        self.paste_engine = PasteEngine(self, self.history)
+
+        # Hotkeys globales primero: responden aunque la biblioteca siga cargando
         self.hotkey_thread = threading.Thread(target=self.register_hotkeys, daemon=True)
         self.hotkey_thread.start()
 
+        # La biblioteca se carga en segundo plano; el hilo de Tk sólo recoge el resultado
+        self._load_result = None
+        self._load_thread = threading.Thread(target=self._load_library, daemon=True)
+        self._load_thread.start()
+
         self.protocol("WM_DELETE_WINDOW", self.quit_app)
+        self.after(LOAD_POLL_MS, self._check_loaded)
+
+    # ---- arranque ----
+    def _load_library(self):
+        try:
+            storage = open_storage()
+            data = Library(storage.load())
+            self.profile.mark("biblioteca cargada")
+            index = storage.make_index(data)
+            self.profile.mark("índice de búsqueda")
+            usage = UsageStore()
+            self.profile.mark("estadísticas de uso")
+            self._load_result = (storage, data, index, GroupIds(data), usage)
+        except Exception as e:
+            self._load_result = e
+
+    def _check_loaded(self):
+        if self._load_thread.is_alive():
+            self.after(LOAD_POLL_MS, self._check_loaded)
+            return
+        if isinstance(self._load_result, Exception):
+            messagebox.showerror("Clipboard Buddy", f"No se pudieron cargar los mensajes.\n{self._load_result}")
+            self.destroy()
+            return
+        self.storage, self.data, self.index, self.groups, self.usage = self._load_result
+        self._load_result = None
+        self.data.observe(self._library_changed)
+        self.loaded = True
+        if POPUP_WARM_STANDBY:
+            self._standby_popup = Popup(self, standby=True)
+            self.profile.mark("popup pre-armado")
+        self.after(COMPACT_INTERVAL_MS, self._compact_tick)
+        self.after(USAGE_FLUSH_MS, self._usage_tick)
+        self.after(WATCH_INTERVAL_MS, self._watch_tick)
+        self.profile.mark("listo")
+
+        for action in self._after_load:
+            action()
+        self._after_load.clear()
+        if self.profile.enabled:
+            print(self.profile.report())
+            self.quit_app()
+
+    # ---- persistencia ----
+    def _library_changed(self, op, fields, local):
+        """
+        Observador de self.data: cada cambio (local o de otro proceso) llega acá ya aplicado.
+        Los locales se persisten; índice e ids de grupo siguen el delta (o se rearman si cambió
+        todo) y las ventanas se enteran por el bus.
+        """
+        if op in FULL_OPS:
+            if local:
+                self.storage.reset(self.data)
+            self.index.rebuild(self.data)
+            self.groups = GroupIds(self.data)
+        else:
+            if local:
+                self.storage.apply(op, fields, self.data)
+            self.index.apply(op, fields, self.data)
+            self.groups.apply(op, fields)
+        self.bus.publish(op, **fields)
+        if local and self.storage.pending >= COMPACT_EVERY_OPS:
+            self._compact()
+
+    def _compact(self, wait=False):
+        """ Snapshot completo: se recopian sólo los grupos sucios, que después quedan limpios. """
+        with self.data.lock:
+            if self.storage.compact(self.data, wait=wait, dirty=self.data.dirty):
+                self.data.clear_dirty()
+
+    def _watch_tick(self):
+        """ Aplica en memoria lo que otros procesos cambiaron en la biblioteca compartida. """
+        try:
+            changes = self.storage.poll()
+        except OSError:
+            changes = []
+        if changes:
+            self._apply_remote(changes)
+        self.after(WATCH_INTERVAL_MS, self._watch_tick)
+
+    def _apply_remote(self, changes):
+        with self.index.lock:
+            for rec in changes:
+                if rec["op"] == "reload":
+                    # Se perdió el hilo (compactación ajena o reemplazo masivo): se relee todo
+                    self.data.replace(self.storage.load(), op="reload", local=False)
+                    break
+                self.data.apply_remote(rec)
+
+    def _compact_tick(self):
+        if self.storage.pending:
+            self._compact()
+        self.after(COMPACT_INTERVAL_MS, self._compact_tick)
+
+    def _usage_tick(self):
+        self.usage.flush()
+        self.after(USAGE_FLUSH_MS, self._usage_tick)
 
     # ---- hotkeys ----
+    def _watch_clipboard(self):
+        """ Hilo del historial: compara el portapapeles cada HISTORY_POLL_MS (no toca Tk). """
+        last = None
+        while not self._closing.wait(HISTORY_POLL_MS / 1000):
+            try:
+                text = pyperclip.paste()
+            except Exception:
+                continue   # portapapeles ocupado por otra app o sin texto: se reintenta
+            if isinstance(text, str) and text != last:
+                last = text
+                self.history.add(text)
+
     def register_hotkeys(self):
         # Nota: en Windows puede requerir ejecutar como Administrador
-        keyboard.add_hotkey(DEFAULT_HOTKEY_POPUP, lambda: self.after(0, self.open_popup))
+        keyboard.add_hotkey(DEFAULT_HOTKEY_POPUP, lambda: self.after(0, self.open_popup, time.perf_counter()))
         keyboard.add_hotkey(DEFAULT_HOTKEY_MANAGER, lambda: self.after(0, self.open_manager))
+        self.profile.mark("hotkeys registradas")
         keyboard.wait()
 
     # ---- ventanas ----
-    def open_popup(self):
-        # Evita duplicados múltiples
-        for w in self.winfo_children():
-            if isinstance(w, Popup):
-                try:
-                    w.lift()
-                    w.focus_force()
-                except:
-                    pass
-                return
-        Popup(self)
+    def open_popup(self, t0=None):
+        t0 = t0 or time.perf_counter()
+        if not self.loaded:
+            # Hotkey durante la carga: se abre apenas esté lista (la latencia incluye la espera)
+            self._after_load.append(lambda: self.open_popup(t0))
+            return
+        if self._standby_popup is not None:
+            if not self._standby_popup.winfo_exists():
+                # Se destruyó por otra vía: se rearma para que el hotkey siga andando
+                self._standby_popup = Popup(self, standby=True)
+            popup = self._standby_popup
+            popup.show()
+        else:
+            popup = None
+            # Evita duplicados múltiples
+            for w in self.winfo_children():
+                if isinstance(w, Popup):
+                    popup = w
+                    try:
+                        w.lift()
+                        w.focus_force()
+                    except:
+                        pass
+                    break
+            if popup is None:
+                popup = Popup(self)
+        # Fuerza el dibujado pendiente para medir hasta que la ventana está en pantalla
+        self.update_idletasks()
+        ms = (time.perf_counter() - t0) * 1000
+        self.popup_latencies.append(ms)
+        status = f"Abierto en {ms:.1f} ms (mediana {statistics.median(self.popup_latencies):.1f} ms)"
+        extra = [s for s in (self.query_cache.summary(), self.paste_engine.summary()) if s]
+        popup.latency_var.set("; ".join([status] + extra))
+
+    def paste_failed(self, msg):
+        messagebox.showwarning("Clipboard Buddy", msg)
 
     def open_manager(self):
+        if not self.loaded:
+            self._after_load.append(self.open_manager)
+            return
         if self._manager and tk.Toplevel.winfo_exists(self._manager):
             try:
                 self._manager.lift()
@@ -613,23 +1513,26 @@ class App(tk.Tk):
             return
         self._manager = ManagerWindow(self)
 
-    # ---- coordinación de refrescos ----
-    def register_popup(self, popup):
-        self._popups.add(popup)
-
-    def unregister_popup(self, popup):
-        self._popups.discard(popup)
-
-    def refresh_all_popups(self):
-        # Si cambio datos en gestor, refresco popups abiertos
-        for p in list(self._popups):
-            try:
-                p.refresh_list()
-            except:
-                pass
-
     def quit_app(self):
+        self._closing.set()
+        self.history.close()
+        if not self.loaded:
+            # Todavía cargando: no hay cambios que guardar
+            self.destroy()
+            return
+        # Escritura diferida: lo que quedó encolado se escribe (con fsync) antes de salir
+        self.storage.flush()
+        if self.storage.pending:
+            self._compact(wait=True)
+        self.storage.close()
+        self.usage.flush(wait=True)
         self.destroy()
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    profile = StartupProfile(enabled="--profile-startup" in argv)
+    profile.mark("imports")
+    App(profile).mainloop()
+
 if __name__ == "__main__":
-    App().mainloop()
+    main()
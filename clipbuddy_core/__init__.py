@@ -0,0 +1,31 @@
+# clipbuddy_core/__init__.py
+# Núcleo de Clipboard Buddy sin interfaz gráfica (no importa tkinter, pyperclip ni keyboard):
+# persistencia, modelo, plantillas, historial del portapapeles, búsqueda e importación/exportación.
+# Lo usan la app y la CLI.
+from .config import (
+    APP_NAME, VIRTUAL_ALL, VIRTUAL_HISTORY, VIRTUAL_GROUPS, is_virtual, SEARCH_TOP_N, QUERY_CACHE_SIZE,
+    RECENCY_WEIGHT, FRECENCY_WEIGHT, FRECENCY_HALF_LIFE,
+)
+from .model import Snippet, LazySnippet, GroupIds, snippet_key, display_text, locate_message, wrap_data, raw_data
+from .library import Library, FULL_OPS
+from .template import Template, CLIPBOARD_FIELD, compile_template
+from .history import ClipboardHistory, HistoryEntry, HISTORY_MAX_ENTRIES, HISTORY_MAX_CHARS
+from .search import SearchIndex, QueryCache, message_rows, match_score, by_frecency, narrows
+from .storage import (
+    DEFAULT_DATA, COMPACT_EVERY_OPS, COMPACT_INTERVAL_MS, USAGE_FLUSH_MS,
+    SNAPSHOT_FORMATS, use_snapshot_format, snapshot_format,
+    use_snippets_file, load_data, save_data, apply_op, apply_change, all_group_names, all_messages_pairs,
+    SnippetJournal, UsageStore, SqliteStorage, FtsIndex, open_storage, migrate_json_to_sqlite,
+)
+
+# Import/export (csv, gzip) se carga recién al pedir uno de sus nombres: la app no lo usa al arrancar
+_TRANSFER = {
+    "iter_export_rows", "iter_doc_rows", "export_rows", "export_to_csv",
+    "read_rows", "import_csv_batches", "import_from_csv",
+}
+
+def __getattr__(name):
+    if name in _TRANSFER:
+        from . import transfer
+        return getattr(transfer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
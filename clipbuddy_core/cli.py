@@ -0,0 +1,176 @@
+# clipbuddy_core/cli.py
+# Manejo de bibliotecas desde la terminal, sin interfaz gráfica:
+#   python -m clipbuddy_core [--library snippets.json] [--storage json|sqlite] COMANDO ...
+#   search "envio gratis" [--group Ventas] [--limit 20] [--exact] [--full]
+#   add Ventas "Texto del mensaje"        (o "-" para leerlo de stdin)
+#   import datos.csv [--replace]           (también .jsonl y .gz)
+#   export salida.jsonl.gz [--group Ventas] [--query promo]
+#   stats
+#   compact                                (reescribe el snapshot; con --snapshot cambia su formato)
+import argparse, os, sys
+
+from .config import VIRTUAL_ALL, SEARCH_TOP_N, is_virtual
+from .model import snippet_key, raw_data, wrap_data
+from .library import Library, FULL_OPS
+from .search import by_frecency
+from . import storage as st
+from .transfer import iter_export_rows, iter_doc_rows, export_rows, import_csv_batches
+
+def _check_group(data, group):
+    if group and group != VIRTUAL_ALL and group not in data:
+        raise ValueError(f"No existe el grupo «{group}».")
+
+def cmd_search(args, storage, data):
+    group = args.group or VIRTUAL_ALL
+    _check_group(data, group)
+    index = storage.make_index(data)
+    q = " ".join(args.query).strip().lower()
+    if args.exact:
+        ids = index.search(group, q)[:args.limit]
+    else:
+        boost = st.UsageStore().boosts(index)
+        if q:
+            ids = index.search_ranked(group, q, limit=args.limit, boost=boost)
+        else:
+            ids = by_frecency(index.search(group, ""), boost)[:args.limit]
+    for doc_id in ids:
+        g, snip = index.docs[doc_id]
+        if args.full:
+            print(f"[{g}]\n{snip.raw}\n")
+        else:
+            print(f"[{g}] {snip.display}")
+
+def cmd_add(args, storage, data):
+    g = args.group.strip()
+    if not g or is_virtual(g):
+        raise ValueError("Nombre de grupo inválido.")
+    text = sys.stdin.read().rstrip("\n") if args.message == "-" else args.message
+    if not text.strip():
+        raise ValueError("El mensaje está vacío.")
+    key = snippet_key(text)
+    if not args.allow_duplicate and any(s.key == key for s in data.get(g, ())):
+        print("Ese mensaje ya existe en el grupo; no se agregó (usar --allow-duplicate).", file=sys.stderr)
+        return 1
+    # El grupo se crea recién cuando se sabe que el mensaje entra
+    if g not in data:
+        data.add_group(g)
+    data.add(g, text)
+
+def cmd_import(args, storage, data):
+    # Las huellas de lo actual se toman antes del primer lote (ver import_csv_batches)
+    current = {} if args.replace else data
+    added = 0
+    if args.replace:
+        new_data = {}
+        for batch in import_csv_batches(args.file, current, replace=True):
+            for g, msgs in batch.items():
+                new_data.setdefault(g, []).extend(msgs)
+                added += len(msgs)
+        data.replace(wrap_data(new_data))
+    else:
+        for batch in import_csv_batches(args.file, current):
+            for g, msgs in batch.items():
+                data.add_many(g, msgs)
+                added += len(msgs)
+    print(f"{added} mensajes {'importados' if args.replace else 'nuevos'}.")
+
+def cmd_export(args, storage, data):
+    _check_group(data, args.group)
+    if args.query:
+        index = storage.make_index(data)
+        rows = iter_doc_rows(index, index.search(args.group or VIRTUAL_ALL, args.query.strip().lower()))
+    else:
+        rows = iter_export_rows(data, args.group)
+    n = export_rows(rows, args.file, fmt=args.format, compress=True if args.gzip else None)
+    print(f"{n} mensajes exportados a {args.file}.")
+
+def cmd_compact(args, storage, data):
+    if isinstance(storage, st.SqliteStorage):
+        raise ValueError("compact es para el backend json (SQLite no tiene snapshot).")
+    storage.flush()
+    st.save_data(raw_data(data), storage.seq)
+    size = os.path.getsize(st.SNIPPETS_FILE)
+    print(f"Snapshot reescrito ({st.snapshot_format()}, {size / 1024:.0f} KiB).")
+
+def cmd_stats(args, storage, data):
+    backend = "sqlite" if isinstance(storage, st.SqliteStorage) else "json"
+    fmt = "" if backend == "sqlite" else f", snapshot {st.snapshot_format()}"
+    print(f"Biblioteca: {storage.path if backend == 'sqlite' else st.SNIPPETS_FILE} ({backend}{fmt})")
+    print(f"Grupos: {len(data)}  Mensajes: {sum(map(len, data.values()))}")
+    print(f"Mensajes con estadísticas de uso: {len(st.UsageStore().stats)}")
+    for g, msgs in data.items():
+        print(f"{len(msgs):8}  {g}")
+
+def persist(storage, data, op, fields, local):
+    """ Observador de la biblioteca: guarda en el backend los cambios hechos por los comandos. """
+    if not local:
+        return
+    if op in FULL_OPS:
+        storage.reset(data)
+    else:
+        storage.apply(op, fields, data)
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="clipbuddy", description="Clipboard Buddy sin interfaz gráfica.")
+    ap.add_argument("--library", help="snippets.json a usar (por defecto, el que está junto a la app)")
+    ap.add_argument("--storage", choices=("json", "sqlite"), help="backend (por defecto, CLIPBUDDY_STORAGE o json)")
+    ap.add_argument("--snapshot", choices=st.SNAPSHOT_FORMATS,
+                    help="formato del snapshot al guardar (por defecto, CLIPBUDDY_SNAPSHOT o el que ya tiene)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("search", help="buscar mensajes")
+    p.add_argument("query", nargs="*")
+    p.add_argument("--group", help="limitar a un grupo")
+    p.add_argument("--limit", type=int, default=SEARCH_TOP_N)
+    p.add_argument("--exact", action="store_true", help="sólo coincidencias exactas, en orden")
+    p.add_argument("--full", action="store_true", help="mostrar el texto completo")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("add", help="agregar un mensaje (crea el grupo si no existe)")
+    p.add_argument("group")
+    p.add_argument("message", help='texto, o "-" para leerlo de stdin')
+    p.add_argument("--allow-duplicate", action="store_true")
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("import", help="importar un CSV (group,message) o JSONL, con .gz opcional")
+    p.add_argument("file")
+    p.add_argument("--replace", action="store_true", help="reemplazar todo en vez de fusionar")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="exportar a CSV o JSONL (.gz para comprimir)")
+    p.add_argument("file")
+    p.add_argument("--group", help="sólo este grupo")
+    p.add_argument("--query", help="sólo los mensajes que contienen este texto")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="por defecto, según la extensión")
+    p.add_argument("--gzip", action="store_true")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("stats", help="resumen de la biblioteca")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("compact", help="reescribir el snapshot (p.ej. para cambiarle el formato)")
+    p.set_defaults(func=cmd_compact)
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.library:
+        st.use_snippets_file(args.library)
+    if args.snapshot:
+        try:
+            st.use_snapshot_format(args.snapshot)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    storage = st.open_storage(args.storage)
+    data = Library(storage.load())
+    data.observe(lambda op, fields, local: persist(storage, data, op, fields, local))
+    try:
+        return args.func(args, storage, data) or 0
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if storage.pending:
+            storage.compact(data, wait=True, dirty=data.dirty)
+        storage.close()
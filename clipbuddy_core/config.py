@@ -0,0 +1,16 @@
+# clipbuddy_core/config.py
+# Constantes compartidas por el núcleo y la interfaz.
+
+APP_NAME = "ClipboardBuddyPro"
+VIRTUAL_ALL = "Todos Los mensajes"
+VIRTUAL_HISTORY = "Historial del portapapeles"   # grupo virtual del popup con lo último copiado
+VIRTUAL_GROUPS = (VIRTUAL_ALL, VIRTUAL_HISTORY)   # nombres reservados: no pueden ser grupos reales
+SEARCH_TOP_N = 300          # resultados rankeados que muestra el popup
+QUERY_CACHE_SIZE = 256      # consultas recientes cuyos resultados se guardan (ver QueryCache)
+RECENCY_WEIGHT = 0.1        # peso de "agregado/editado hace poco" en el ranking
+FRECENCY_WEIGHT = 1.0       # peso máximo del uso frecuente/reciente en el ranking
+FRECENCY_HALF_LIFE = 7 * 24 * 3600   # cada semana sin usarlo, el puntaje de uso se reduce a la mitad
+
+def is_virtual(g):
+    """ True si g es el nombre de un grupo virtual (no se puede crear ni renombrar a él). """
+    return g in VIRTUAL_GROUPS
@@ -0,0 +1,161 @@
+# clipbuddy_core/history.py
+import os, shutil, tempfile, threading, time
+from collections import OrderedDict
+
+from .model import snippet_key, display_text
+
+# ---------- Historial del portapapeles ----------
+HISTORY_MAX_ENTRIES = 200           # capacidad del buffer: al llenarse se descarta lo más viejo
+HISTORY_MAX_CHARS = 1_000_000       # tope de texto en memoria sumando todas las entradas
+HISTORY_INLINE_CHARS = 20_000       # más largo que esto se guarda en disco y en memoria queda un extracto
+HISTORY_MAX_ENTRY_CHARS = 5_000_000 # lo que pase de esto se trunca (ni en disco se guarda entero)
+HISTORY_PREVIEW_CHARS = 300         # extracto que se muestra y en el que se busca
+HISTORY_SKIP_SECONDS = 5.0          # vencimiento de skip() si el watcher nunca llegó a ver el texto
+
+class HistoryEntry:
+    """
+    Algo copiado al portapapeles. Se comporta como un Snippet para el popup (display, folded,
+    raw, key, template), pero si es largo el texto completo vive en disco y raw lo lee al pegar.
+    """
+    __slots__ = ("key", "display", "folded", "size", "copied_at", "_text", "_path")
+    template = None     # el historial se pega tal cual, sin campos {{nombre}}
+
+    def __init__(self, text, key, path=None):
+        self.key = key
+        self.size = len(text)
+        self.copied_at = time.time()
+        self._path = path
+        self._text = text[:HISTORY_PREVIEW_CHARS] if path else text
+        preview = text[:HISTORY_PREVIEW_CHARS]
+        self.display = display_text(preview)
+        if len(text) > HISTORY_PREVIEW_CHARS:
+            self.display += f" … ({len(text)} caracteres)"
+        self.folded = preview.lower()
+
+    @property
+    def raw(self):
+        if self._path is None:
+            return self._text
+        try:
+            with open(self._path, "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except OSError:
+            return self._text   # el archivo temporal se perdió: al menos el extracto
+
+    @property
+    def mem_chars(self):
+        return len(self._text)
+
+class ClipboardHistory:
+    """
+    Buffer acotado con lo último copiado (lo más nuevo primero), sin repetidos: volver a copiar
+    algo que ya está lo sube al principio. Se alimenta desde un hilo (add) y se lee desde el de Tk
+    (entries), por eso todo pasa bajo un lock.
+    Memoria acotada por cantidad (HISTORY_MAX_ENTRIES) y por texto total (HISTORY_MAX_CHARS);
+    lo largo se vuelca a un directorio temporal que se borra al cerrar.
+    """
+    def __init__(self, max_entries=HISTORY_MAX_ENTRIES, max_chars=HISTORY_MAX_CHARS):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries = OrderedDict()   # huella -> HistoryEntry, lo más viejo primero
+        self._chars = 0
+        self._skip = {}                 # huella -> vencimiento, de lo que copió la propia app (no es historial)
+        self._lock = threading.Lock()
+        self._spill_dir = None
+        self.version = 0                # cambia con cada alta o borrado (el popup lo compara al mostrarse)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def skip(self, text, seconds=HISTORY_SKIP_SECONDS):
+        """
+        El próximo add() de este texto se ignora (lo copió la app para pegar un snippet).
+        Vence a los `seconds`: si el watcher no llegó a verlo, una copia real posterior no se pierde.
+        """
+        with self._lock:
+            self._skip[snippet_key(text)] = time.monotonic() + seconds
+
+    def unskip(self, text):
+        """ Deja sin efecto skip(text) (el texto ya no está en el portapapeles). """
+        with self._lock:
+            self._skip.pop(snippet_key(text), None)
+
+    def add(self, text):
+        """ Registra un texto copiado. True si el historial cambió. """
+        if not text or not text.strip():
+            return False
+        text = text[:HISTORY_MAX_ENTRY_CHARS]
+        key = snippet_key(text)
+        with self._lock:
+            if self._skip:
+                now = time.monotonic()
+                for k in [k for k, until in self._skip.items() if until <= now]:
+                    del self._skip[k]
+                if self._skip.pop(key, None) is not None:
+                    return False
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Repetido: pasa a ser lo más nuevo
+                entry.copied_at = time.time()
+                self._entries.move_to_end(key)
+            else:
+                path = None
+                if len(text) > HISTORY_INLINE_CHARS:
+                    path = self._spill(key, text)
+                    if path is None:
+                        text = text[:HISTORY_INLINE_CHARS]   # sin disco: se conserva el comienzo
+                entry = self._entries[key] = HistoryEntry(text, key, path)
+                self._chars += entry.mem_chars
+                self._evict()
+            self.version += 1
+            return True
+
+    def entries(self, q=""):
+        """ Entradas (lo más nuevo primero); con q, las que contienen todas sus palabras. """
+        with self._lock:
+            items = list(reversed(self._entries.values()))
+        terms = q.split()
+        if terms:
+            items = [e for e in items if all(t in e.folded for t in terms)]
+        return items
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                self._drop_file(entry)
+            self._entries.clear()
+            self._chars = 0
+            self.version += 1
+
+    def close(self):
+        """ Borra lo volcado a disco. """
+        self.clear()
+        if self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._chars > self.max_chars):
+            _, old = self._entries.popitem(last=False)
+            self._chars -= old.mem_chars
+            self._drop_file(old)
+
+    def _spill(self, key, text):
+        """ Guarda el texto completo en el directorio temporal; None si no se pudo (queda el extracto). """
+        try:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix="clipbuddy-history-")
+            path = os.path.join(self._spill_dir, key.hex() + ".txt")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            return path
+        except OSError:
+            return None
+
+    @staticmethod
+    def _drop_file(entry):
+        if entry._path:
+            try:
+                os.remove(entry._path)
+            except OSError:
+                pass
@@ -0,0 +1,134 @@
+# clipbuddy_core/library.py
+import threading
+
+from .config import VIRTUAL_ALL, is_virtual
+from .model import Snippet
+from .storage import apply_change
+
+# ---------- Biblioteca observable ----------
+FULL_OPS = ("reset", "reload")      # cambió todo: no hay delta, se rearma lo que dependa
+
+class Library(dict):
+    """
+    dict[grupo, list[Snippet]] que se modifica sólo con sus métodos (add, edit, delete, ...).
+    Cada cambio sube version, marca el grupo como sucio y avisa a los observadores con
+    fn(op, fields, local): op y fields como en el journal (ver apply_op), local=False si el
+    cambio vino de otro proceso (ya está persistido). Así persistencia, índice y ventanas
+    hacen sólo el trabajo del delta.
+    - version: cuenta de cambios (sólo crece).
+    - group_version(g): version del último cambio que tocó g (la caché del popup la usa de clave).
+    - dirty: grupos cambiados desde el último clear_dirty() (la compactación recopia sólo esos).
+    - lock: cada cambio (datos, version y observadores) pasa entero bajo este lock; el índice
+      de búsqueda usa el mismo, así quien lo toma ve datos, índice y version coherentes.
+    Leer sigue siendo como un dict; escribir directo (data[g] = ...) no avisa a nadie.
+    """
+    def __init__(self, data=()):
+        super().__init__(data)
+        self.pop(VIRTUAL_ALL, None)
+        self.lock = threading.RLock()
+        self.version = 0
+        self.dirty = set()
+        self._group_versions = {}
+        self._reset_version = 0
+        self._observers = []
+
+    def observe(self, fn):
+        self._observers.append(fn)
+
+    def group_version(self, g):
+        return max(self._group_versions.get(g, 0), self._reset_version)
+
+    def clear_dirty(self):
+        """ Devuelve los grupos sucios y los marca limpios. """
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    # ---- cambios locales ----
+    @staticmethod
+    def _check_new_group(g):
+        if is_virtual(g):
+            raise ValueError(f"«{g}» es un grupo virtual: elegí otro nombre.")
+
+    def add_group(self, g):
+        self._check_new_group(g)
+        with self.lock:
+            if g in self:
+                raise ValueError(f"Ya existe el grupo «{g}».")
+            self[g] = []
+            return self._changed("add_group", {"g": g})
+
+    def rename_group(self, g, new):
+        self._check_new_group(new)
+        with self.lock:
+            if new in self:
+                raise ValueError(f"Ya existe el grupo «{new}».")
+            self[new] = self.pop(g)
+            return self._changed("rename_group", {"g": g, "new": new})
+
+    def delete_group(self, g):
+        with self.lock:
+            del self[g]
+            return self._changed("del_group", {"g": g})
+
+    def add(self, g, text):
+        """ Agrega un mensaje al final de g (crea el grupo si no existe). Devuelve el Snippet. """
+        snip = Snippet(text)
+        with self.lock:
+            if g not in self:
+                self._check_new_group(g)
+            self.setdefault(g, []).append(snip)
+            self._changed("add", {"g": g, "m": text})
+        return snip
+
+    def add_many(self, g, texts):
+        texts = list(texts)
+        with self.lock:
+            if g not in self:
+                self._check_new_group(g)
+            self.setdefault(g, []).extend(Snippet(m) for m in texts)
+            return self._changed("add_many", {"g": g, "ms": texts})
+
+    def edit(self, g, i, text):
+        """ Reemplaza el texto del mensaje i de g; el Snippet nuevo conserva el id. """
+        with self.lock:
+            msgs = self[g]
+            old = msgs[i].raw
+            msgs[i] = Snippet(text, id=msgs[i].id)
+            return self._changed("edit", {"g": g, "i": i, "m": text, "old": old})
+
+    def delete(self, g, i):
+        with self.lock:
+            old = self[g].pop(i).raw
+            return self._changed("del", {"g": g, "i": i, "old": old})
+
+    def replace(self, new_data, op="reset", local=True):
+        """ Reemplazo completo (importación que reemplaza, o recarga tras cambios ajenos). """
+        with self.lock:
+            self.dirty.update(self)
+            self.clear()
+            self.update(new_data)
+            self.pop(VIRTUAL_ALL, None)
+            return self._changed(op, {}, local)
+
+    # ---- cambios de otros procesos ----
+    def apply_remote(self, rec):
+        """ Aplica un cambio leído del backend (ver apply_change). Devuelve sus campos o None. """
+        with self.lock:
+            fields = apply_change(self, rec)
+            if fields is None:
+                return None
+            return self._changed(rec["op"], fields, local=False)
+
+    def _changed(self, op, fields, local=True):
+        self.version += 1
+        if op in FULL_OPS:
+            self._reset_version = self.version
+            self.dirty.update(self)
+        else:
+            for k in ("g", "new"):
+                if k in fields:
+                    self._group_versions[fields[k]] = self.version
+                    self.dirty.add(fields[k])
+        for fn in self._observers:
+            fn(op, fields, local)
+        return fields
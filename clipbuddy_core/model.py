@@ -0,0 +1,144 @@
+# clipbuddy_core/model.py
+import hashlib, itertools
+
+from .config import VIRTUAL_ALL
+from .template import compile_template
+
+# ---------- Modelo ----------
+def snippet_key(text):
+    """ Huella estable (8 bytes) del texto de un snippet: sobrevive reinicios y reordenamientos. """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+def display_text(text):
+    """ Una sola línea para los listbox: los saltos de línea (\n, \r\n, \r) se muestran como ⏎. """
+    return text.replace("\r\n", "\n").replace("\r", "\n").replace("\n", " ⏎ ")
+
+_snippet_ids = itertools.count(1)
+_group_ids = itertools.count(1)
+
+def reserve_snippet_ids(max_id):
+    """ Los ids nuevos arrancan después de max_id (cuando los ids vienen persistidos, p.ej. SQLite). """
+    global _snippet_ids
+    # Nunca hacia atrás: puede llamarse otra vez con ids que llegan de otro proceso
+    _snippet_ids = itertools.count(max(next(_snippet_ids), max_id + 1))
+
+class Snippet:
+    """
+    Mensaje con sus formas derivadas ya calculadas (una vez, al cargar o editar).
+    id: estable durante la sesión; al editar, el Snippet nuevo hereda el id del anterior.
+    template: Template compilado si el texto tiene campos {{nombre}}, si no None.
+    """
+    __slots__ = ("id", "raw", "display", "folded", "template", "_key")
+
+    def __init__(self, raw, id=None):
+        self.id = next(_snippet_ids) if id is None else id
+        self.raw = raw
+        self._key = None
+        self.display = display_text(raw)
+        self.folded = raw.lower()
+        self.template = compile_template(raw)
+
+    @property
+    def key(self):
+        """ Huella del texto (ver snippet_key); se calcula recién cuando se necesita. """
+        if self._key is None:
+            self._key = snippet_key(self.raw)
+        return self._key
+
+_UNSET = object()
+
+class LazySnippet:
+    """
+    Snippet cuyo texto completo se queda en el backend (SQLite, mapeado en memoria) y se lee
+    recién cuando hace falta (pegar, editar, exportar). En memoria sólo id, huella y el comienzo
+    del texto para las listas, así la memoria no crece con el largo de los mensajes.
+    fetch(id) devuelve el texto. raw y folded no se guardan; la plantilla, una vez compilada, sí.
+    """
+    __slots__ = ("id", "display", "_fetch", "_key", "_template")
+
+    def __init__(self, id, head, fetch, key=None, truncated=False):
+        self.id = id
+        self._fetch = fetch
+        self._key = key
+        self._template = _UNSET
+        self.display = display_text(head)
+        if truncated:
+            self.display += " …"
+
+    @property
+    def raw(self):
+        return self._fetch(self.id)
+
+    @property
+    def folded(self):
+        return self.raw.lower()
+
+    @property
+    def key(self):
+        if self._key is None:
+            self._key = snippet_key(self.raw)
+        return self._key
+
+    @property
+    def template(self):
+        if self._template is _UNSET:
+            self._template = compile_template(self.raw)
+        return self._template
+
+class GroupIds:
+    """ Id estable por grupo (no cambia al renombrar), para no depender del nombre ni del orden. """
+    def __init__(self, names=()):
+        self.by_name = {}
+        self.names = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        gid = self.by_name.get(name)
+        if gid is None:
+            gid = self.by_name[name] = next(_group_ids)
+            self.names[gid] = name
+        return gid
+
+    def rename(self, old, new):
+        gid = self.by_name.pop(old)
+        self.by_name[new] = gid
+        self.names[gid] = new
+
+    def remove(self, name):
+        gid = self.by_name.pop(name, None)
+        self.names.pop(gid, None)
+
+    def apply(self, op, fields):
+        """ Refleja las operaciones de grupo del journal (ver apply_op). """
+        if op in ("add_group", "add", "add_many"):
+            self.add(fields["g"])
+        elif op == "rename_group":
+            self.rename(fields["g"], fields["new"])
+        elif op == "del_group":
+            self.remove(fields["g"])
+
+def wrap_data(data):
+    """ dict[grupo, list[str]] -> dict[grupo, list[Snippet]] """
+    return {g: [Snippet(m) for m in msgs] for g, msgs in data.items() if g != VIRTUAL_ALL}
+
+def locate_message(msgs, i, old=None, id=None):
+    """
+    Posición actual del mensaje que un cambio señaló como (i, texto anterior), o None.
+    Si la lista cambió mientras tanto (otro proceso, un diálogo abierto) se busca por el texto,
+    o por id si el cambio lo trae (SQLite: los ids son los de la base, iguales en todos los procesos).
+    """
+    if id is not None:
+        if 0 <= i < len(msgs) and msgs[i].id == id:
+            return i
+        return next((j for j, m in enumerate(msgs) if m.id == id), None)
+    if old is None:
+        return i if 0 <= i < len(msgs) else None
+    if 0 <= i < len(msgs) and getattr(msgs[i], "raw", msgs[i]) == old:
+        return i
+    hits = [j for j, m in enumerate(msgs) if getattr(m, "raw", m) == old]
+    return min(hits, key=lambda j: abs(j - i)) if hits else None
+
+def raw_data(data):
+    """ dict[grupo, list[Snippet]] -> dict[grupo, list[str]] (lo que se persiste) """
+    return {g: [s.raw for s in msgs] for g, msgs in data.items() if g != VIRTUAL_ALL}
@@ -0,0 +1,507 @@
+# clipbuddy_core/search.py
+import re, heapq, threading
+from collections import Counter, OrderedDict
+
+from .config import VIRTUAL_ALL, SEARCH_TOP_N, QUERY_CACHE_SIZE, RECENCY_WEIGHT
+
+# ---------- Búsqueda ----------
+def message_rows(msgs, q):
+    """ Filas del gestor para un grupo: (posición, Snippet.id, display) de los que contienen q. """
+    return [(i, s.id, s.display) for i, s in enumerate(msgs) if not q or q in s.folded]
+
+_WORD_RE = re.compile(r"\w+")
+_LAST_WORD_RE = re.compile(r"\w+$")
+
+def trigrams(s):
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+def within_one_edit(a, b):
+    """ True si a y b difieren en a lo sumo una letra (cambiada, de más, de menos o dos transpuestas). """
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < la and i < lb and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return (a[i+1:] == b[i+1:] or
+                (a[i:i+1] == b[i+1:i+2] and a[i+1:i+2] == b[i:i+1] and a[i+2:] == b[i+2:]))
+    if la > lb:
+        return a[i+1:] == b[i:]
+    return a[i:] == b[i+1:]
+
+def match_score(term, word):
+    """
+    Qué tan bien representa una palabra del vocabulario al término tipeado (0 = nada).
+    Comienzo de palabra > dentro de la palabra > subsecuencia (suman los tramos
+    consecutivos) > un error de tipeo (comparando contra el prefijo de la palabra).
+    """
+    pos = word.find(term)
+    if pos == 0:
+        return 1.0 if len(word) == len(term) else 0.9
+    if pos > 0:
+        return 0.7
+    n = len(term)
+    score, run, j = 0, 0, 0
+    for ch in term:
+        k = word.find(ch, j)
+        if k < 0:
+            break
+        run = run + 1 if k == j else 1
+        score += run
+        j = k + 1
+    else:
+        bonus = 0.05 if word[0] == term[0] else 0.0
+        return 0.3 + 0.3 * score / (n * (n + 1) / 2) + bonus
+    if n >= 4 and any(within_one_edit(term, word[:m]) for m in (n - 1, n, n + 1)):
+        return 0.5
+    return 0.0
+
+def _as_sets(ids):
+    """ Un nivel puede ser un set o una lista de sets (postings sin unir). """
+    return ids if isinstance(ids, list) else (ids,)
+
+def _best_first(levels):
+    """ Combinaciones (suma, índice de nivel por término) de mayor a menor suma. """
+    def total(combo):
+        return sum(levels[t][k][0] for t, k in enumerate(combo))
+    start = (0,) * len(levels)
+    heap, seen = [(-total(start), start)], {start}
+    while heap:
+        neg, combo = heapq.heappop(heap)
+        yield -neg, combo
+        for t in range(len(combo)):
+            if combo[t] + 1 < len(levels[t]):
+                nxt = combo[:t] + (combo[t] + 1,) + combo[t+1:]
+                if nxt not in seen:
+                    seen.add(nxt)
+                    heapq.heappush(heap, (-total(nxt), nxt))
+
+def narrows(prev, q):
+    """
+    True si todo lo que matchea q (en search_ranked) matchea también prev: q es prev con más
+    letras o palabras tecleadas. Alargar una palabra sólo achica si ya tenía 6 letras (o si
+    sigue con 3 o menos): de 4 letras en adelante se tolera un error de tipeo (ver match_score)
+    y hasta 6 basta un trigrama en común para ser candidata (ver _fuzzy_words), así que el
+    trigrama nuevo puede sumar palabras que la consulta anterior ni miró.
+    """
+    if len(q) <= len(prev) or not q.startswith(prev) or not _WORD_RE.search(prev):
+        return False
+    last = _LAST_WORD_RE.search(prev)
+    if last is None or not _WORD_RE.match(q, len(prev)):
+        return True     # la última palabra de prev quedó completa: q sólo agrega condiciones
+    grown = _WORD_RE.match(q, last.start()).group()
+    return len(last.group()) >= 6 or len(grown) <= 3
+
+def by_frecency(ids, boost):
+    """ Los usados primero (de más a menos uso), el resto en su orden original. """
+    if not boost:
+        return ids
+    used = sorted((i for i in ids if i in boost), key=boost.get, reverse=True)
+    if not used:
+        return ids
+    first = set(used)
+    return used + [i for i in ids if i not in first]
+
+class SearchIndex:
+    """
+    Índice invertido para el buscador del popup.
+    - postings: palabra -> ids de los mensajes que la contienen
+    - grams: trigrama -> palabras del vocabulario que lo contienen
+    Cada término de la consulta se resuelve contra el vocabulario (no contra los mensajes),
+    y la comparación completa (q in texto) sólo se hace sobre los candidatos.
+    """
+    def __init__(self, data):
+        # La búsqueda corre en un hilo aparte (SearchScheduler); las mutaciones, en el de Tk.
+        # Con una Library se comparte su lock: un cambio (datos, version e índice) es atómico
+        # para quien busca
+        self.lock = getattr(data, "lock", None) or threading.RLock()
+        self.rebuild(data)
+
+    def rebuild(self, data):
+        with self.lock:
+            self._rebuild(data)
+
+    def _rebuild(self, data):
+        self.docs = {}            # Snippet.id -> (grupo, Snippet)
+        self.group_ids = {}       # grupo -> [ids], mismo orden que data[g] (ids crecientes)
+        self.postings = {}
+        self.grams = {}
+        self.short_words = set()  # palabras de 1-2 letras: no tienen trigramas
+        self.touched = {}         # id -> momento del último alta/edición en esta sesión
+        self._tick = 0
+        self._by_key = None       # huella -> ids; se arma la primera vez que se pide
+        for g, msgs in data.items():
+            if g == VIRTUAL_ALL:
+                continue
+            self.group_ids[g] = [self._add_doc(g, s) for s in msgs]
+
+    def _add_doc(self, g, snip, touched=False):
+        doc_id = snip.id
+        self.docs[doc_id] = (g, snip)
+        if self._by_key is not None:
+            self._by_key.setdefault(snip.key, set()).add(doc_id)
+        if touched:
+            self._tick += 1
+            self.touched[doc_id] = self._tick
+        self._index_words(doc_id, snip)
+        return doc_id
+
+    def _index_words(self, doc_id, snip):
+        for w in set(_WORD_RE.findall(snip.folded)):
+            ids = self.postings.get(w)
+            if ids is None:
+                ids = self.postings[w] = set()
+                self._add_word(w)
+            ids.add(doc_id)
+
+    def _remove_doc(self, doc_id):
+        _, snip = self.docs.pop(doc_id)
+        self.touched.pop(doc_id, None)
+        if self._by_key is not None:
+            ids = self._by_key.get(snip.key)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._by_key[snip.key]
+        self._unindex_words(doc_id, snip)
+
+    def _unindex_words(self, doc_id, snip):
+        for w in set(_WORD_RE.findall(snip.folded)):
+            ids = self.postings.get(w)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if not ids:
+                del self.postings[w]
+                self._remove_word(w)
+
+    def _add_word(self, w):
+        if len(w) < 3:
+            self.short_words.add(w)
+            return
+        for t in trigrams(w):
+            self.grams.setdefault(t, set()).add(w)
+
+    def _remove_word(self, w):
+        if len(w) < 3:
+            self.short_words.discard(w)
+            return
+        for t in trigrams(w):
+            words = self.grams.get(t)
+            if words is not None:
+                words.discard(w)
+                if not words:
+                    del self.grams[t]
+
+    def apply(self, op, fields, data):
+        """ Refleja en el índice una operación del journal ya aplicada sobre data (ver apply_op). """
+        with self.lock:
+            self._apply(op, fields, data)
+
+    def _apply(self, op, fields, data):
+        g = fields["g"]
+        if op == "add":
+            self.group_ids.setdefault(g, []).append(self._add_doc(g, data[g][-1], touched=True))
+        elif op == "add_many":
+            n = len(fields["ms"])
+            ids = self.group_ids.setdefault(g, [])
+            ids.extend(self._add_doc(g, snip) for snip in data[g][len(data[g]) - n:])
+        elif op == "edit":
+            # El Snippet editado conserva el id, así no se altera el orden dentro del grupo
+            i = fields["i"]
+            ids = self.group_ids[g]
+            self._remove_doc(ids[i])
+            ids[i] = self._add_doc(g, data[g][i], touched=True)
+        elif op == "del":
+            self._remove_doc(self.group_ids[g].pop(fields["i"]))
+        elif op == "add_group":
+            self.group_ids.setdefault(g, [])
+        elif op == "rename_group":
+            new = fields["new"]
+            ids = self.group_ids[new] = self.group_ids.pop(g)
+            for doc_id in ids:
+                self.docs[doc_id] = (new, self.docs[doc_id][1])
+        elif op == "del_group":
+            for doc_id in self.group_ids.pop(g, []):
+                self._remove_doc(doc_id)
+
+    def message_rows(self, msgs, g, q):
+        """ Filas del gestor para el grupo g (msgs es su foto; ver message_rows). """
+        return message_rows(msgs, q)
+
+    def ids_for_key(self, key):
+        """ Ids de los mensajes con esa huella de texto (puede haber repetidos). """
+        with self.lock:
+            if self._by_key is None:
+                by_key = {}
+                for doc_id, (_, snip) in self.docs.items():
+                    by_key.setdefault(snip.key, set()).add(doc_id)
+                self._by_key = by_key
+            return self._by_key.get(key, ())
+
+    def _words_for_term(self, term):
+        """ Palabras del vocabulario que contienen term. """
+        if len(term) >= 3:
+            words = min((self.grams.get(t, ()) for t in trigrams(term)), key=len)
+        else:
+            # Término corto: se recorre el vocabulario de trigramas, no los mensajes
+            words = set(self.short_words)
+            for t, ws in self.grams.items():
+                if term in t:
+                    words |= ws
+        return [w for w in words if term in w]
+
+    def _ids_for_term(self, term):
+        ids = set()
+        for w in self._words_for_term(term):
+            ids |= self.postings[w]
+        return ids
+
+    def _fuzzy_words(self, term):
+        """ {palabra: puntaje} de las palabras del vocabulario que pueden ser term (con errores). """
+        if len(term) < 3:
+            cands = self._words_for_term(term)
+        else:
+            # Candidatas: comparten casi todos los trigramas (un error toca a lo sumo tres)
+            grams = trigrams(term)
+            counts = Counter()
+            for t in grams:
+                counts.update(self.grams.get(t, ()))
+            need = max(1, len(grams) - 3)
+            cands = [w for w, c in counts.items() if c >= need]
+        out = {}
+        for w in cands:
+            sc = match_score(term, w)
+            if sc:
+                # Puntajes discretos: pocos niveles por término
+                out[w] = round(sc * 20) / 20
+        return out
+
+    def _term_postings(self, term):
+        """ [(puntaje, [postings de cada palabra])] de mayor a menor puntaje. """
+        by_score = {}
+        for w, sc in self._fuzzy_words(term).items():
+            by_score.setdefault(sc, []).append(self.postings[w])
+        return sorted(by_score.items(), reverse=True)
+
+    def _term_levels(self, postings_by_score, within=None):
+        """
+        [(puntaje, ids)] de mayor a menor; cada mensaje queda sólo en su mejor nivel.
+        Con within se intersecta cada postings antes de unir (mucho más barato si within es chico).
+        """
+        levels, seen = [], set()
+        for sc, postings in postings_by_score:
+            if within is None:
+                ids = set().union(*postings)
+            else:
+                ids = set().union(*(p & within for p in postings))
+            ids -= seen
+            if ids:
+                levels.append((sc, ids))
+                seen |= ids
+        return levels
+
+    def search_ranked(self, group, q, limit=SEARCH_TOP_N, boost=None, within=None):
+        """
+        Búsqueda difusa: hasta limit ids de group, de mejor a peor, para q (ya en minúsculas).
+        Cada término se puntúa contra el vocabulario y un mensaje suma, por término, el
+        puntaje de su mejor palabra (todos los términos tienen que aparecer).
+        Las combinaciones de niveles se recorren de mayor a menor suma intersectando sets,
+        y se corta apenas hay limit resultados: no se puntúa ni ordena todo el corpus.
+        (Un mensaje puede estar en varios niveles del término "lazy": la primera
+        combinación que lo alcanza es la de mayor suma, y ésa es la que queda.)
+        boost: {id: extra} opcional (uso frecuente, etc.); junto con lo editado hace poco,
+        se evalúa aparte para que pueda subir aunque esté en un nivel más bajo.
+        within: sólo se consideran esos ids (ver refine_ranked).
+        """
+        scope = None if group == VIRTUAL_ALL else group
+        docs = self.docs
+        terms = sorted(set(_WORD_RE.findall(q)), key=len, reverse=True)
+        if not terms:
+            ids = self.search(group, q)
+            if within is not None:
+                within = set(within)
+                ids = [i for i in ids if i in within]
+            return ids[:limit]
+        if within is not None:
+            scope_ids = set(within)
+        else:
+            scope_ids = set(self.group_ids.get(scope, ())) if scope is not None else None
+        base = {}
+        per_term = [self._term_postings(t) for t in terms]
+        levels = None
+        if all(per_term):
+            # El término más caro (más postings; típicamente el corto que se está tipeando)
+            # queda sin unir y se recorre palabra por palabra. Los demás se arman como sets,
+            # del más selectivo al menos, cada uno restringido a los mensajes del anterior.
+            cost = [sum(len(p) for _, ps in pt for p in ps) for pt in per_term]
+            lazy = max(range(len(terms)), key=cost.__getitem__)
+            levels = [None] * len(terms)
+            levels[lazy] = per_term[lazy]
+            within = scope_ids
+            for t in sorted(range(len(terms)), key=cost.__getitem__):
+                if t != lazy:
+                    levels[t] = self._term_levels(per_term[t], within)
+                    within = set().union(*(ids for _, ids in levels[t]))
+            if not all(levels):
+                levels = None
+        if levels:
+            for total, combo in _best_first(levels):
+                fixed = sorted((levels[t][k][1] for t, k in enumerate(combo) if t != lazy), key=len)
+                if scope_ids is not None:
+                    fixed.insert(0, scope_ids)
+                other = fixed[0].intersection(*fixed[1:]) if fixed else None
+                if other is not None and not other:
+                    continue
+                for p in levels[lazy][combo[lazy]][1]:
+                    ids = p if other is None else p & other
+                    # Empates dentro del nivel: da igual cuáles entran; se corta al llegar a limit
+                    for i in ids.difference(base):
+                        base[i] = total
+                        if len(base) >= limit:
+                            break
+                    if len(base) >= limit:
+                        break
+                if len(base) >= limit:
+                    break
+        if scope is None:
+            # En el grupo virtual también cuenta que coincida el nombre del grupo
+            for g, ids in self.group_ids.items():
+                if q in g.lower():
+                    for i in ids[:limit]:
+                        if scope_ids is None or i in scope_ids:
+                            base.setdefault(i, 1.0)
+
+        extra = {i: RECENCY_WEIGHT * t / (self._tick or 1) for i, t in self.touched.items()}
+        for i, b in (boost or {}).items():
+            extra[i] = extra.get(i, 0.0) + b
+        if levels:
+            # Los mensajes con extra se puntúan aunque hayan quedado fuera por el corte
+            for i in extra:
+                if i in base or i not in docs or (scope_ids is not None and i not in scope_ids):
+                    continue
+                total = 0.0
+                for lv in levels:
+                    sc = next((sc for sc, ids in lv if any(i in p for p in _as_sets(ids))), None)
+                    if sc is None:
+                        break
+                    total += sc
+                else:
+                    base[i] = total
+        if len(terms) > 1 or q != terms[0]:
+            # Frase textual (con un solo término ya la cubre el puntaje por palabra)
+            for i in base:
+                if q in docs[i][1].folded:
+                    base[i] += 1.0
+        return heapq.nlargest(limit, base, key=lambda i: base[i] + extra.get(i, 0.0))
+
+    def refine_ranked(self, group, q, prev, prev_ids, limit=SEARCH_TOP_N, boost=None):
+        """
+        search_ranked de q buscando sólo entre prev_ids, el resultado de la consulta anterior prev.
+        None si no se puede asegurar que dé lo mismo que buscar en todo: prev_ids se cortó en
+        limit (le pueden faltar mensajes) o q no achica a prev (ver narrows).
+        """
+        if len(prev_ids) >= limit or not narrows(prev, q):
+            return None
+        return self.search_ranked(group, q, limit, boost, within=prev_ids)
+
+    def search(self, group, q):
+        """ Ids (en el orden de data) de los mensajes de group que contienen q (ya en minúsculas). """
+        scope = None if group == VIRTUAL_ALL else group
+        if not q:
+            if scope is not None:
+                return list(self.group_ids.get(scope, []))
+            return [i for ids in self.group_ids.values() for i in ids]
+        docs = self.docs
+        terms = set(_WORD_RE.findall(q))
+        if terms:
+            cands = None
+            for term in sorted(terms, key=len, reverse=True):
+                ids = self._ids_for_term(term)
+                cands = ids if cands is None else cands & ids
+                if not cands:
+                    break
+            hits = {i for i in cands if (scope is None or docs[i][0] == scope) and q in docs[i][1].folded}
+        else:
+            # Sólo signos o espacios: no hay palabras para buscar en el índice
+            pool = self.group_ids.get(scope, []) if scope is not None else docs
+            hits = {i for i in pool if q in docs[i][1].folded}
+        if scope is None:
+            # En el grupo virtual también cuenta que coincida el nombre del grupo
+            for g, ids in self.group_ids.items():
+                if q in g.lower():
+                    hits.update(ids)
+        rank = {g: r for r, g in enumerate(self.group_ids)}
+        return sorted(hits, key=lambda i: (rank[docs[i][0]], i))
+
+class QueryCache:
+    """
+    LRU de resultados de búsqueda (tuplas de ids) por (grupo, consulta, versión).
+    version identifica lo buscado (p.ej. Library.group_version y la del uso): cuando cambia,
+    las entradas viejas ya no se encuentran y se van solas por LRU.
+    Al seguir tecleando, si está guardada una consulta anterior (un prefijo de la nueva),
+    refine(prefijo, ids) puede calcular sobre esos ids en vez de sobre todo el corpus
+    (None si no corresponde: se calcula con compute()).
+    Se usa desde el hilo de búsqueda y desde el de Tk: todo bajo un lock.
+    """
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0           # consultas que ya estaban
+        self.refined = 0        # calculadas filtrando el resultado de un prefijo
+        self.misses = 0         # calculadas sobre todo el corpus
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, group, q, version, compute, refine=None):
+        """ Ids para (group, q, version): guardados, refinando un prefijo, o de compute(). """
+        key = (group, q, version)
+        prev = None
+        with self._lock:
+            ids = self._entries.get(key)
+            if ids is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ids
+            if refine is not None:
+                # El prefijo guardado más largo (normalmente, lo tecleado justo antes)
+                for k in range(len(q) - 1, 0, -1):
+                    prev_ids = self._entries.get((group, q[:k], version))
+                    if prev_ids is not None:
+                        prev = (q[:k], prev_ids)
+                        break
+        ids = refine(*prev) if prev else None
+        refined = ids is not None
+        if not refined:
+            ids = compute()
+        ids = tuple(ids)
+        with self._lock:
+            if refined:
+                self.refined += 1
+            else:
+                self.misses += 1
+            self._entries[key] = ids
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self):
+        """ Fracción de consultas resueltas sin recorrer todo el corpus (guardadas o refinadas). """
+        total = self.hits + self.refined + self.misses
+        return (self.hits + self.refined) / total if total else 0.0
+
+    def summary(self):
+        """ Resumen para mostrar (vacío si todavía no hubo consultas). """
+        total = self.hits + self.refined + self.misses
+        if not total:
+            return ""
+        return f"caché de búsqueda {self.hit_rate:.0%} ({self.hits} guardadas, {self.refined} refinadas de {total})"
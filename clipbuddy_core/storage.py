@@ -0,0 +1,1210 @@
+# clipbuddy_core/storage.py
+import os, re, json, stat, time, zlib, struct, tempfile, itertools, threading, warnings
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+from .config import APP_NAME, VIRTUAL_ALL, SEARCH_TOP_N, is_virtual, FRECENCY_WEIGHT, FRECENCY_HALF_LIFE
+from .model import Snippet, LazySnippet, snippet_key, locate_message, wrap_data, raw_data, reserve_snippet_ids
+from .search import _WORD_RE, SearchIndex, by_frecency, message_rows
+
+# ---------- Persistencia ----------
+def appdata_path():
+    base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    folder = os.path.join(base, APP_NAME)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+# Guardar junto al script (misma carpeta que el .py / .exe, un nivel arriba de este paquete)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNIPPETS_FILE = os.path.join(BASE_DIR, "snippets.json")
+
+DEFAULT_DATA = {
+    "General": [
+        "¡Gracias por tu compra!",
+        "¿Cómo puedo ayudarte?",
+        "Te paso el link en un momento."
+    ],
+    "Ventas": [
+        "Promo: membresía $5/mes con cursos, comunidad y calculadoras.",
+        "Envío en 24-48 h hábiles.",
+        "Stock disponible, ¡aprovechá!"
+    ]
+}
+
+# Backend de persistencia: "json" (snippets.json + journal) o "sqlite" (snippets.db con FTS5)
+STORAGE_BACKEND = os.environ.get("CLIPBUDDY_STORAGE", "json")
+
+JOURNAL_FILE = SNIPPETS_FILE + ".journal"
+LOCK_FILE = SNIPPETS_FILE + ".lock"   # lock entre procesos que comparten la biblioteca
+JOURNAL_KEEP_OPS = 500                # al compactar quedan en el journal para quien venga atrasado
+JOURNAL_SEQ_KEY = "__journal_seq__"   # en el snapshot: última operación del journal ya incluida
+COMPACT_EVERY_OPS = 200               # compacta cuando el journal acumula tantas operaciones
+COMPACT_INTERVAL_MS = 60_000          # ... o periódicamente si quedó algo pendiente
+JOURNAL_FLUSH_MS = 250                # los cambios se juntan este tiempo y se escriben con un solo fsync
+
+# Formato del snapshot: "json" (legible, el de siempre), "zlib" o "zstd" (empaquetado y comprimido;
+# zstd necesita el paquete zstandard). Sin valor se conserva el formato que ya tiene el archivo.
+# Al leer se detecta solo. CLIPBUDDY_SNAPSHOT se valida al importar (ver el final del módulo).
+SNAPSHOT_FORMAT = None
+SNAPSHOT_FORMATS = ("json", "zlib", "zstd")
+
+def use_snapshot_format(fmt):
+    """ Formato de los próximos snapshots (None: el del archivo actual). ValueError si no se puede usar. """
+    global SNAPSHOT_FORMAT
+    if fmt is not None and fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Formato de snapshot desconocido: {fmt} (opciones: {', '.join(SNAPSHOT_FORMATS)})")
+    if fmt == "zstd":
+        _zstd()     # sin el paquete falla acá y no en cada compactación
+    SNAPSHOT_FORMAT = fmt
+
+def use_snippets_file(path):
+    """ Apunta la persistencia a otra biblioteca (journal, uso y base SQLite van al lado). """
+    global SNIPPETS_FILE, JOURNAL_FILE, LOCK_FILE, USAGE_FILE
+    SNIPPETS_FILE = os.path.abspath(path)
+    JOURNAL_FILE = SNIPPETS_FILE + ".journal"
+    LOCK_FILE = SNIPPETS_FILE + ".lock"
+    USAGE_FILE = SNIPPETS_FILE + ".usage"
+
+def read_snapshot(path=None):
+    """ Lee el snapshot JSON. Devuelve (data, seq) donde seq es la última operación compactada. """
+    path = path or SNIPPETS_FILE
+    # Crea archivo si no existe
+    if not os.path.exists(path):
+        _replace(_write_tmp(path, DEFAULT_DATA), path)
+    # Lee (JSON o empaquetado, según los primeros bytes)
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw.startswith(_PACKED_MAGIC):
+        data = _unpack_snapshot(raw)
+    else:
+        data = json.loads(raw.decode("utf-8-sig"))
+    # Asegura estructura válida
+    if not isinstance(data, dict):
+        data = {g: list(msgs) for g, msgs in DEFAULT_DATA.items()}
+    seq = data.pop(JOURNAL_SEQ_KEY, 0)
+    if not isinstance(seq, int):
+        seq = 0
+    # Nunca persistimos el grupo virtual
+    data.pop(VIRTUAL_ALL, None)
+    # Normaliza listas de texto
+    for g, msgs in list(data.items()):
+        if not isinstance(msgs, list):
+            data[g] = []
+        else:
+            data[g] = [str(m) for m in msgs if isinstance(m, (str, int, float))]
+    return data, seq
+
+def apply_op(data, rec):
+    """ Aplica una operación del journal sobre data (misma semántica que el gestor). """
+    if rec["op"] == "reset":
+        # Marca de reemplazo masivo: el snapshot escrito junto con ella ya tiene todo
+        return
+    op, g = rec["op"], rec["g"]
+    if op == "add":
+        data.setdefault(g, []).append(rec["m"])
+    elif op == "add_many":
+        data.setdefault(g, []).extend(rec["ms"])
+    elif op == "edit":
+        i = locate_message(data[g], rec["i"], rec.get("old"))
+        if i is not None:
+            data[g][i] = rec["m"]
+    elif op == "del":
+        i = locate_message(data[g], rec["i"], rec.get("old"))
+        if i is not None:
+            del data[g][i]
+    elif op == "add_group":
+        data.setdefault(g, [])
+    elif op == "rename_group":
+        data[rec["new"]] = data.pop(g)
+    elif op == "del_group":
+        data.pop(g, None)
+    else:
+        raise ValueError(f"Operación desconocida: {op}")
+
+def apply_change(data, rec):
+    """
+    Aplica sobre data (listas de Snippet) un cambio hecho por otro proceso.
+    Devuelve los campos para index.apply / groups.apply, con la posición ya resuelta,
+    o None si el cambio ya no corresponde (p.ej. el mensaje ya se borró acá).
+    """
+    op, g = rec["op"], rec.get("g")
+    fields = {k: v for k, v in rec.items() if k not in ("seq", "op")}
+    ids = rec.get("ids") or ()      # SQLite: rowids de los mensajes nuevos
+    msgs = data.get(g)
+    if op == "add":
+        data.setdefault(g, []).append(Snippet(rec["m"], id=ids[0] if ids else None))
+    elif op == "add_many":
+        new = [Snippet(m, id=sid) for m, sid in itertools.zip_longest(rec["ms"], ids[:len(rec["ms"])])]
+        data.setdefault(g, []).extend(new)
+    elif op in ("edit", "del"):
+        i = locate_message(msgs, rec["i"], rec.get("old"), rec.get("id")) if msgs else None
+        if i is None:
+            return None
+        if op == "edit":
+            msgs[i] = Snippet(rec["m"], id=msgs[i].id)
+        else:
+            del msgs[i]
+        fields["i"] = i
+    elif op == "add_group":
+        if msgs is not None:
+            return None
+        data[g] = []
+    elif op == "rename_group":
+        if msgs is None or rec["new"] in data:
+            return None
+        data[rec["new"]] = data.pop(g)
+    elif op == "del_group":
+        if msgs is None:
+            return None
+        del data[g]
+    else:
+        return None
+    if ids:
+        reserve_snippet_ids(max(ids))
+    return fields
+
+def replay_journal(data, base_seq=0, path=None):
+    """ Reaplica sobre data las operaciones posteriores a base_seq. Devuelve el último seq visto. """
+    path = path or JOURNAL_FILE
+    seq = base_seq
+    if not os.path.exists(path):
+        return seq
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                # Línea truncada (p.ej. corte de luz a mitad de escritura): se ignora
+                continue
+            if rec.get("seq", 0) <= base_seq:
+                continue
+            try:
+                apply_op(data, rec)
+            except (KeyError, IndexError, ValueError):
+                pass
+            seq = max(seq, rec["seq"])
+    return seq
+
+def load_data():
+    data, seq = read_snapshot()
+    replay_journal(data, seq)
+    return data
+
+def _replace(tmp, path, attempts=20):
+    """ os.replace con reintentos: en Windows falla si otro proceso tiene el destino abierto. """
+    for n in range(attempts):
+        try:
+            os.replace(tmp, path)
+            _fsync_dir(path)
+            return
+        except PermissionError:
+            if n == attempts - 1:
+                raise
+            time.sleep(0.05)
+
+def _fsync_dir(path):
+    """ Asegura en disco el rename dentro de la carpeta (en Windows no se puede ni hace falta). """
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# Un snapshot a la vez por proceso (compactación en segundo plano, reset, save_data):
+# el último en renombrar gana, así que no pueden pisarse a medio escribir
+_snapshot_lock = threading.Lock()
+
+# mkstemp crea con 0600: el temporal toma los permisos del archivo que va a reemplazar (o los
+# de un archivo nuevo) para que la biblioteca siga siendo de todos los que la comparten
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _open_tmp(path, mode="w"):
+    """ (archivo, ruta) de un temporal nuevo junto a path: cada escritura tiene el suyo. """
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(path) or ".")
+    try:
+        perms = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        perms = 0o666 & ~_UMASK
+    try:
+        os.chmod(tmp, perms)
+    except OSError:
+        pass
+    if "b" in mode:
+        return os.fdopen(fd, mode), tmp
+    return os.fdopen(fd, mode, encoding="utf-8", newline=""), tmp
+
+def _discard_tmp(tmp):
+    try:
+        os.remove(tmp)
+    except FileNotFoundError:
+        pass
+
+def _write_tmp(path, obj):
+    """ Vuelca obj como JSON a un temporal propio (ver _open_tmp), con fsync. Devuelve su ruta. """
+    f, tmp = _open_tmp(path)
+    try:
+        with f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        _discard_tmp(tmp)
+        raise
+    return tmp
+
+# ---------- Snapshot empaquetado ----------
+# magic | códec, disposición, seq | tabla de grupos | tramos comprimidos.
+# La tabla es JSON [[nombre, cantidad], ...]; cada tramo lleva ~PACKED_FRAME_BYTES de mensajes
+# unidos por \x1e (UTF-8), que se recuperan con un split en vez de parsear JSON. Los tramos son
+# independientes: se comprimen y descomprimen en paralelo (zlib y zstd sueltan el GIL).
+# Si algún mensaje contiene \x1e, un único tramo con el JSON compacto.
+# Los prefijos de URL repetidos los absorbe el compresor (la ventana los ve una y otra vez).
+_PACKED_MAGIC = b"CBSNAP1\n"
+_PACKED_HEADER = struct.Struct("<BBQ")      # códec, disposición, seq
+_PACKED_FRAME = struct.Struct("<II")        # bytes comprimidos, cantidad de mensajes
+_PACKED_CODECS = {"zlib": 1, "zstd": 2}
+_PACKED_SEP = "\x1e"
+_PACKED_TABLE, _PACKED_JSON = 1, 2
+PACKED_FRAME_BYTES = 1 << 20
+PACKED_ZLIB_LEVEL = 3       # más alto comprime un poco más pero guarda bastante más lento
+PACKED_ZSTD_LEVEL = 3
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("El formato zstd necesita el paquete zstandard (pip install zstandard).") from None
+    return zstandard
+
+def _parallel_map(fn, items):
+    if len(items) <= 1 or (os.cpu_count() or 1) <= 1:
+        return [fn(x) for x in items]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(len(items), os.cpu_count(), 8)) as ex:
+        return list(ex.map(fn, items))
+
+def _codec(fmt):
+    """ (comprimir, descomprimir) del formato. """
+    if fmt == "zstd":
+        zstd = _zstd()
+        return (lambda b: zstd.ZstdCompressor(level=PACKED_ZSTD_LEVEL).compress(b),
+                lambda b: zstd.ZstdDecompressor().decompress(b))
+    return (lambda b: zlib.compress(b, PACKED_ZLIB_LEVEL)), zlib.decompress
+
+def _frames(msgs):
+    """ Tramos de mensajes de ~PACKED_FRAME_BYTES. """
+    chunk, size = [], 0
+    for m in msgs:
+        chunk.append(m)
+        size += len(m) + 1
+        if size >= PACKED_FRAME_BYTES:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+def _pack_snapshot(data, seq, fmt):
+    """ bytes del snapshot empaquetado de data (dict[grupo, list[str]]). """
+    compress = _codec(fmt)[0]
+    msgs = [m for g in data for m in data[g]]
+    if any(_PACKED_SEP in m for m in msgs):
+        layout, table = _PACKED_JSON, b""
+        frames = [(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 0)]
+    else:
+        layout = _PACKED_TABLE
+        table = json.dumps([[g, len(data[g])] for g in data], ensure_ascii=False).encode("utf-8")
+        frames = [(_PACKED_SEP.join(c).encode("utf-8"), len(c)) for c in _frames(msgs)]
+    bodies = _parallel_map(compress, [b for b, _ in frames])
+    out = [_PACKED_MAGIC, _PACKED_HEADER.pack(_PACKED_CODECS[fmt], layout, seq or 0),
+           struct.pack("<I", len(table)), table]
+    for body, (_, n) in zip(bodies, frames):
+        out += [_PACKED_FRAME.pack(len(body), n), body]
+    return b"".join(out)
+
+def _unpack_snapshot(raw):
+    """ dict del snapshot empaquetado, con JOURNAL_SEQ_KEY como en el JSON. """
+    off = len(_PACKED_MAGIC)
+    codec, layout, seq = _PACKED_HEADER.unpack_from(raw, off)
+    fmt = {v: k for k, v in _PACKED_CODECS.items()}.get(codec)
+    if fmt is None:
+        raise ValueError(f"Snapshot con códec desconocido ({codec}).")
+    decompress = _codec(fmt)[1]
+    off += _PACKED_HEADER.size
+    (table_len,) = struct.unpack_from("<I", raw, off)
+    off += 4
+    table = raw[off:off + table_len]
+    off += table_len
+    bodies = []
+    while off < len(raw):
+        size, _ = _PACKED_FRAME.unpack_from(raw, off)
+        off += _PACKED_FRAME.size
+        bodies.append(raw[off:off + size])
+        off += size
+    parts = _parallel_map(decompress, bodies)
+    if layout == _PACKED_JSON:
+        data = json.loads(parts[0].decode("utf-8"))
+    else:
+        # Se parte en bytes y se decodifica cada mensaje: los que son sólo ASCII quedan compactos
+        msgs = []
+        for part in parts:
+            msgs.extend(map(bytes.decode, part.split(b"\x1e")))
+        data, pos = {}, 0
+        for g, n in json.loads(table.decode("utf-8")):
+            data[g] = msgs[pos:pos + n]
+            pos += n
+    data[JOURNAL_SEQ_KEY] = seq
+    return data
+
+def snapshot_format(path=None):
+    """ Formato del snapshot en disco ("json", "zlib", "zstd"); "json" si no existe. """
+    try:
+        with open(path or SNIPPETS_FILE, "rb") as f:
+            head = f.read(len(_PACKED_MAGIC) + _PACKED_HEADER.size)
+    except FileNotFoundError:
+        return "json"
+    if not head.startswith(_PACKED_MAGIC) or len(head) < len(_PACKED_MAGIC) + _PACKED_HEADER.size:
+        return "json"
+    codec = _PACKED_HEADER.unpack_from(head, len(_PACKED_MAGIC))[0]
+    return {v: k for k, v in _PACKED_CODECS.items()}.get(codec, "json")
+
+def _snapshot_tmp(data, seq=None):
+    """ Escribe el snapshot a un temporal (ver _write_tmp) y devuelve su ruta. """
+    safe = dict(data)
+    safe.pop(VIRTUAL_ALL, None)
+    fmt = SNAPSHOT_FORMAT or snapshot_format()
+    if fmt != "json":
+        packed = _pack_snapshot(safe, seq, fmt)
+        f, tmp = _open_tmp(SNIPPETS_FILE, "wb")
+        try:
+            with f:
+                f.write(packed)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            _discard_tmp(tmp)
+            raise
+        return tmp
+    if seq is not None:
+        safe = {JOURNAL_SEQ_KEY: seq, **safe}
+    return _write_tmp(SNIPPETS_FILE, safe)
+
+def snapshot_seq(path=None):
+    """ seq del snapshot leyendo sólo el encabezado (JOURNAL_SEQ_KEY va primero); 0 si no tiene. """
+    try:
+        with open(path or SNIPPETS_FILE, "rb") as f:
+            head = f.read(256)
+    except FileNotFoundError:
+        return 0
+    if head.startswith(_PACKED_MAGIC):
+        if len(head) < len(_PACKED_MAGIC) + _PACKED_HEADER.size:
+            return 0
+        return _PACKED_HEADER.unpack_from(head, len(_PACKED_MAGIC))[2]
+    m = re.search(r'"%s":\s*(\d+)' % JOURNAL_SEQ_KEY, head.decode("utf-8", "ignore"))
+    return int(m.group(1)) if m else 0
+
+def save_data(data, seq=None):
+    """
+    Escribe el snapshot completo (archivo temporal + rename), con el lock entre procesos.
+    Sin seq se asume que data ya incluye todo: el journal deja de tener sentido y se borra.
+    """
+    with _snapshot_lock:
+        tmp = _snapshot_tmp(data, seq)
+        with FileLock(LOCK_FILE):
+            _replace(tmp, SNIPPETS_FILE)
+            if seq is None:
+                try:
+                    os.remove(JOURNAL_FILE)
+                except FileNotFoundError:
+                    pass
+
+class FileLock:
+    """
+    Lock exclusivo entre procesos (y entre hilos) sobre un archivo auxiliar:
+    flock en POSIX, msvcrt.locking en Windows. Se usa con "with".
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.Lock()
+        self._fh = None
+
+    def __enter__(self):
+        self._local.acquire()
+        try:
+            fh = open(self.path, "a+b")
+            if fcntl:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            else:
+                fh.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK se rinde a los ~10 s: se sigue esperando
+                        continue
+            self._fh = fh
+        except BaseException:
+            self._local.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        fh, self._fh = self._fh, None
+        try:
+            if fcntl:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            fh.close()
+            self._local.release()
+
+class SnippetJournal:
+    """
+    Journal append-only de cambios (add/edit/del/add_group/rename_group/del_group).
+    Cada cambio agrega una línea JSON en vez de reescribir snippets.json; cada tanto
+    se compacta en segundo plano: se escribe el snapshot y se recorta el journal.
+
+    Varios procesos pueden compartir la biblioteca: cada escritura toma LOCK_FILE, lee
+    antes lo que agregaron los demás (así los seq son globales) y poll() entrega esos
+    cambios ajenos para aplicarlos en memoria sin recargar todo.
+
+    Escritura diferida: log() sólo encola; a los JOURNAL_FLUSH_MS (o en flush()) se escribe
+    todo lo encolado de una vez y con un solo fsync. Al salir hay que llamar a flush()/close().
+    Lo encolado ya está aplicado en memoria: si al escribirlo aparecen cambios ajenos (que
+    quedan antes en el journal), el orden en memoria no coincide con el del disco y poll()
+    pide recargar; mientras tanto no se compacta.
+    """
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_FILE
+        self.lock = FileLock(LOCK_FILE)
+        self.seq = 0                # último cambio ya reflejado en memoria
+        self.pending = 0            # operaciones aún no compactadas
+        self._lock = threading.Lock()           # estado de lectura (dentro de self.lock)
+        self._compacted_seq = 0
+        self._worker = None
+        self._read_seq = 0          # último cambio leído del archivo
+        self._offset = 0            # bytes del journal ya leídos
+        self._ident = None          # (dispositivo, inodo, tamaño) del journal leído: cambia al recortarlo
+        self._head = b""            # primeros bytes del journal leído (el inodo puede reutilizarse)
+        self._incoming = []         # cambios de otros procesos aún no entregados por poll()
+        self._reloading = False     # poll() pidió recargar y todavía no se llamó a load()
+        self._queue = []            # cambios propios aún no escritos
+        self._timer = None
+        self._copied = {}           # grupo -> textos del último snapshot (o de la carga)
+
+    def load(self):
+        """ Snapshot + replay del journal; deja registrada la posición de lectura. """
+        # Lo encolado se escribe antes: así queda incluido en lo que se lee
+        self.flush()
+        with self.lock, self._lock:
+            data, base = read_snapshot()
+            self._compacted_seq = base
+            self.seq = self._read_seq = replay_journal(data, base, self.path)
+            self.pending = self.seq - base
+            self._incoming = []
+            self._reloading = False
+            self._mark_read()
+        self._copied = data
+        return wrap_data(data)
+
+    def make_index(self, data):
+        return SearchIndex(data)
+
+    def apply(self, op, fields, data):
+        """ Interfaz común de los backends: registra un cambio ya aplicado sobre data. """
+        self.log(op, **fields)
+
+    def log(self, op, **fields):
+        with self._lock:
+            self._queue.append({"op": op, **fields})
+            if self._timer is None:
+                self._timer = threading.Timer(JOURNAL_FLUSH_MS / 1000, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """ Escribe lo encolado: un append y un fsync para todo el lote. """
+        with self.lock, self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._queue:
+                return
+            # Primero lo que escribieron otros: los seq nuevos van después de todo lo existente
+            self._read_new()
+            if self._incoming:
+                # Lo ajeno va antes en el journal, pero en memoria lo encolado ya está aplicado:
+                # reaplicarlo encima dejaría otro resultado que en el disco. Se relee todo.
+                self._incoming = [{"op": "reload"}]
+            lines = []
+            for rec in self._queue:
+                self._read_seq += 1
+                lines.append(json.dumps({"seq": self._read_seq, **rec}, ensure_ascii=False) + "\n")
+            if not self._incoming:
+                self.seq = self._read_seq
+            # Se abre y cierra en cada lote: otro proceso puede reemplazar el archivo al compactar
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self._mark_read()
+            self.pending += len(self._queue)
+            self._queue = []
+
+    def reset(self, data):
+        """ Reemplazo masivo (importación): los demás procesos ven una marca y recargan todo. """
+        snapshot = self._copied = raw_data(data)
+        # Espera a una compactación en curso: su snapshot (más viejo) no puede quedar encima
+        with _snapshot_lock, self.lock, self._lock:
+            self._queue = []            # lo encolado era sobre los datos reemplazados
+            self._read_new()
+            self._incoming = []         # lo de otros queda reemplazado
+            self._read_seq += 1
+            self.seq = self._compacted_seq = self._read_seq
+            # Snapshot antes que la marca: quien la vea ya encuentra los datos nuevos
+            _replace(_snapshot_tmp(snapshot, self.seq), SNIPPETS_FILE)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"seq": self.seq, "op": "reset"}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._mark_read()
+            self.pending = 0
+
+    def poll(self):
+        """
+        Cambios de otros procesos desde la última vez, en orden. Si no hubo nada cuesta un stat.
+        Un {"op": "reload"} indica que se perdió el hilo (journal recortado) y hay que recargar.
+        """
+        with self._lock:
+            if not self._incoming and self._ident == self._stat_ident():
+                return []
+        # Lo encolado va primero: si hay cambios ajenos ya no pueden aplicarse encima (ver flush)
+        self.flush()
+        with self.lock, self._lock:
+            self._read_new()
+            changes, self._incoming = self._incoming, []
+            self.seq = self._read_seq
+            if any(rec["op"] == "reload" for rec in changes):
+                self._reloading = True
+        return changes
+
+    def _stat_ident(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_size)
+
+    def _read_head(self):
+        try:
+            with open(self.path, "rb") as f:
+                return f.read(256)
+        except FileNotFoundError:
+            return b""
+
+    def _mark_read(self):
+        """ Todo el archivo actual ya está leído (o escrito por este proceso). """
+        self._ident = self._stat_ident()
+        self._offset = self._ident[2] if self._ident else 0
+        self._head = self._read_head()
+
+    def _read_new(self):
+        """ Lee del journal lo agregado por otros procesos (con self.lock tomado). """
+        ident = self._stat_ident()
+        if ident == self._ident:
+            return
+        head = self._read_head()
+        rescan = (ident is None or self._ident is None or ident[:2] != self._ident[:2]
+                  or ident[2] < self._offset or head[:len(self._head)] != self._head)
+        if rescan:
+            # Journal recortado o reemplazado: se relee desde el principio
+            self._offset = 0
+        new = []
+        if ident is not None:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+            end = chunk.rfind(b"\n") + 1     # una línea a medio escribir queda para después
+            self._offset += end
+            for line in chunk[:end].splitlines():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("seq", 0) > self._read_seq:
+                    new.append(rec)
+        self._ident = (ident[0], ident[1], self._offset) if ident else None
+        self._head = head
+        if rescan and snapshot_seq() > self._read_seq and (not new or new[0]["seq"] > self._read_seq + 1):
+            # Otro proceso compactó cambios que este no llegó a leer
+            new = [{"op": "reload"}]
+            self._read_seq = max(snapshot_seq(), self._read_seq)
+        elif new:
+            self._read_seq = new[-1]["seq"]
+        if any(rec["op"] == "reset" for rec in new):
+            new = [{"op": "reload"}]
+        self._incoming.extend(new)
+
+    def compact(self, data, wait=False, dirty=None):
+        """
+        Toma una copia de data (en el hilo de Tk) y la vuelca al snapshot en un hilo aparte.
+        dirty: grupos cambiados desde la copia anterior (Library.dirty); de los demás se reusa
+        la lista de textos ya copiada. None: se copia todo.
+        True si se tomó la copia; False si no se pudo (lo sucio sigue sucio).
+        """
+        self.flush()
+        with self._lock:
+            if self._incoming or self._reloading:
+                # Hay cambios ajenos sin aplicar en memoria: la copia quedaría incompleta
+                return False
+            seq = self.seq
+            self.pending = 0
+        if dirty is None:
+            snapshot = raw_data(data)
+        else:
+            # Las listas copiadas no se modifican nunca: las de grupos limpios se comparten
+            copied = self._copied
+            snapshot = {g: copied[g] if g in copied and g not in dirty else [s.raw for s in msgs]
+                        for g, msgs in data.items() if g != VIRTUAL_ALL}
+        self._copied = snapshot
+        self._worker = threading.Thread(target=self._compact, args=(snapshot, seq), daemon=True)
+        self._worker.start()
+        if wait:
+            self._worker.join()
+        return True
+
+    def _compact(self, snapshot, seq):
+        with _snapshot_lock:
+            if seq <= self._compacted_seq:
+                return
+            # Se escribe fuera del lock; bajo el lock sólo el rename y el recorte
+            tmp = _snapshot_tmp(snapshot, seq)
+            with self.lock:
+                current = snapshot_seq()
+                if current < seq:
+                    _replace(tmp, SNIPPETS_FILE)
+                else:
+                    # Otro proceso ya dejó un snapshot igual o más nuevo
+                    _discard_tmp(tmp)
+                self._compacted_seq = seq
+                # Recorta lo ya incluido en el snapshot, salvo una cola para los procesos
+                # que todavía no lo leyeron; lo agregado mientras tanto se conserva
+                cut = max(seq, current) - JOURNAL_KEEP_OPS
+                keep = []
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            try:
+                                if json.loads(line).get("seq", 0) > cut:
+                                    keep.append(line)
+                            except ValueError:
+                                continue
+                except FileNotFoundError:
+                    return
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(keep)
+                    f.flush()
+                    os.fsync(f.fileno())
+                with self._lock:
+                    self._read_new()
+                    _replace(tmp, self.path)
+                    self._mark_read()
+
+    def close(self):
+        self.flush()
+        if self._worker:
+            self._worker.join()
+
+USAGE_FILE = SNIPPETS_FILE + ".usage"
+USAGE_FLUSH_MS = 30_000     # las estadísticas de uso se escriben por lotes
+_USAGE_RECORD = struct.Struct("<8sfII")   # huella, puntaje, último uso (epoch), cantidad
+
+class UsageStore:
+    """
+    Estadísticas de uso por snippet (por huella del texto) con puntaje "frecency":
+    cada pegado suma 1 y el puntaje se reduce a la mitad cada FRECENCY_HALF_LIFE.
+    En disco son registros fijos de 20 bytes; se reescribe por lotes en un hilo aparte.
+    Otros procesos pueden compartir el archivo: al escribir se combina (bajo LOCK_FILE) con lo
+    que ya hay en disco en vez de pisarlo, y lo combinado vuelve a memoria.
+    """
+    def __init__(self, path=None):
+        self.path = path or USAGE_FILE
+        self.stats = {}         # huella -> (puntaje, último uso, cantidad)
+        self.dirty = False
+        self.version = 0        # cambia con cada uso registrado (para cachés de resultados)
+        self._lock = threading.Lock()
+        self._worker = None
+        self.load()
+
+    def load(self):
+        self.stats.update(self._read())
+
+    def _read(self):
+        """ {huella: (puntaje, último uso, cantidad)} del archivo ({} si no existe). """
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return {}
+        size = _USAGE_RECORD.size
+        # Un registro incompleto al final (escritura cortada) se descarta
+        return {key: (score, last, count)
+                for key, score, last, count in (_USAGE_RECORD.unpack_from(raw, off)
+                                                for off in range(0, len(raw) - size + 1, size))}
+
+    @classmethod
+    def _merge(cls, a, b):
+        """ Une las estadísticas de una huella vistas por dos procesos (cualquiera puede ser None). """
+        if a is None or b is None:
+            return a or b
+        last = max(a[1], b[1])
+        score = max(cls._decay(a[0], last - a[1]), cls._decay(b[0], last - b[1]))
+        return (score, last, max(a[2], b[2]))
+
+    def record(self, key, now=None):
+        now = int(now or time.time())
+        with self._lock:
+            score, last, count = self.stats.get(key, (0.0, now, 0))
+            self.stats[key] = (self._decay(score, now - last) + 1.0, now, count + 1)
+            self.dirty = True
+            self.version += 1
+
+    @staticmethod
+    def _decay(score, age):
+        return score * 0.5 ** (max(0, age) / FRECENCY_HALF_LIFE)
+
+    def frecency(self, key, now=None):
+        st = self.stats.get(key)
+        if st is None:
+            return 0.0
+        return self._decay(st[0], int(now or time.time()) - st[1])
+
+    def boosts(self, index, now=None):
+        """ {id del índice: extra de ranking} para los snippets usados alguna vez. """
+        now = int(now or time.time())
+        with self._lock:
+            items = list(self.stats.items())
+        out = {}
+        for key, (score, last, _) in items:
+            f = self._decay(score, now - last)
+            if f <= 0:
+                continue
+            extra = FRECENCY_WEIGHT * f / (f + 1.0)
+            for doc_id in index.ids_for_key(key):
+                out[doc_id] = extra
+        return out
+
+    def flush(self, wait=False):
+        """ Escribe (en un hilo aparte) si hubo usos desde la última vez. """
+        with self._lock:
+            if not self.dirty:
+                return
+            stats = dict(self.stats)
+            self.dirty = False
+        if self._worker:
+            self._worker.join()
+        self._worker = threading.Thread(target=self._write, args=(stats,), daemon=True)
+        self._worker.start()
+        if wait:
+            self._worker.join()
+
+    def _write(self, stats):
+        with FileLock(LOCK_FILE):
+            # Lo que escribieron los demás procesos se conserva: se queda el uso más reciente
+            # y la cantidad más alta de cada huella
+            disk = self._read()
+            for k, v in stats.items():
+                disk[k] = self._merge(disk.get(k), v)
+            f, tmp = _open_tmp(self.path, "wb")
+            try:
+                with f:
+                    f.write(b"".join(_USAGE_RECORD.pack(k, sc, last, n) for k, (sc, last, n) in disk.items()))
+                    f.flush()
+                    os.fsync(f.fileno())
+                _replace(tmp, self.path)
+            except BaseException:
+                _discard_tmp(tmp)
+                raise
+        with self._lock:
+            changed = False
+            for k, v in disk.items():
+                cur = self.stats.get(k)
+                merged = self._merge(cur, v)
+                # En disco el puntaje es float32: sólo cuenta como cambio un uso ajeno
+                if cur is None or merged[1:] != cur[1:]:
+                    self.stats[k] = merged
+                    changed = True
+            if changed:
+                self.version += 1
+
+def all_group_names(data):
+    # Un grupo real con nombre reservado (de antes de reservarlo) quedaría tapado por el virtual
+    names = sorted([g for g in data.keys() if not is_virtual(g)], key=lambda s: s.lower())
+    return [VIRTUAL_ALL] + names
+
+def all_messages_pairs(data):
+    """ Devuelve lista de tuplas (grupo, mensaje) para el grupo virtual. """
+    pairs = []
+    for g, msgs in data.items():
+        if g == VIRTUAL_ALL:
+            continue
+        for m in msgs:
+            pairs.append((g, m))
+    return pairs
+
+# ---------- Persistencia: SQLite + FTS5 (opcional) ----------
+SQLITE_FTS_LIMIT = 1000     # tope de filas que trae el gestor al filtrar con FTS
+SQLITE_CHANGES_KEEP = 10_000   # cambios que se conservan en la tabla changes para otros procesos
+SQLITE_LAZY_BODIES = True   # al cargar se trae sólo el comienzo de cada mensaje; el resto al pegar/editar
+SQLITE_PREVIEW_CHARS = 200  # comienzo que queda en memoria para las listas (ver LazySnippet)
+SQLITE_MMAP_BYTES = 1 << 30 # la base se lee mapeada en memoria (páginas del SO, no copias en Python)
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups(
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    ord INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snippets(
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL REFERENCES groups(id),
+    pos INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    key BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(
+    body, content='snippets', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS changes(
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    rec TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS snippets_ai AFTER INSERT ON snippets BEGIN
+    INSERT INTO snippets_fts(rowid, body) VALUES (new.id, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS snippets_ad AFTER DELETE ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, body) VALUES ('delete', old.id, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS snippets_au AFTER UPDATE OF body ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    INSERT INTO snippets_fts(rowid, body) VALUES (new.id, new.body);
+END;
+"""
+
+# Se crean después de migrar (las bases viejas no tienen la columna key).
+# snippets_head cubre la carga: grupo, orden y comienzo del texto sin leer los cuerpos enteros.
+# Reemplaza a snippets_group_pos (mismo prefijo), que si no el planificador elige y lee los cuerpos.
+_SQLITE_INDEXES = f"""
+DROP INDEX IF EXISTS snippets_group_pos;
+CREATE INDEX IF NOT EXISTS snippets_head ON snippets(group_id, pos, substr(body, 1, {SQLITE_PREVIEW_CHARS + 1}));
+CREATE INDEX IF NOT EXISTS snippets_key ON snippets(key);
+"""
+
+def sqlite_path():
+    return os.path.splitext(SNIPPETS_FILE)[0] + ".db"
+
+def fts_query(q):
+    """ Consulta FTS5: cada palabra como prefijo, todas obligatorias. None si no hay palabras. """
+    words = _WORD_RE.findall(q)
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+class SqliteStorage:
+    """
+    Backend SQLite: grupos y mensajes en tablas, con un índice FTS5 sincronizado por triggers.
+    Misma interfaz que SnippetJournal (load/apply/compact/reset/poll/close/make_index); cada
+    cambio es una sentencia SQL y un commit, y la búsqueda textual se resuelve con FTS + LIMIT.
+    La primera vez migra snippets.json (+ journal) si existe.
+    Cada cambio se anota también en la tabla changes: poll() trae los de otros procesos.
+    Con SQLITE_LAZY_BODIES load() arma LazySnippet: en memoria quedan id, huella y el comienzo
+    del texto; el cuerpo completo se lee de la base (mapeada en memoria) recién al usarlo.
+    """
+    def __init__(self, path=None):
+        self.path = path or sqlite_path()
+        self.pending = 0        # cada cambio ya queda confirmado: nunca hay nada pendiente
+        self._lock = threading.RLock()   # la conexión se comparte con el hilo de búsqueda
+        self.conn = None
+        self._seen = 0          # último cambio de la tabla changes ya reflejado en memoria
+        self._own = set()       # cambios escritos por esta conexión (poll los saltea)
+        self._data_version = None
+
+    def open(self):
+        import sqlite3
+        self.close()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        self.conn.executescript(_SQLITE_SCHEMA)
+        with self.conn:
+            if "key" not in [row[1] for row in self.conn.execute("PRAGMA table_info(snippets)")]:
+                self.conn.execute("ALTER TABLE snippets ADD COLUMN key BLOB")
+            self.conn.executescript(_SQLITE_INDEXES)
+            # Huellas que falten (base vieja, o filas escritas por una versión anterior)
+            if self.conn.execute("SELECT 1 FROM snippets WHERE key IS NULL LIMIT 1").fetchone():
+                self.conn.create_function("snippet_key", 1, snippet_key, deterministic=True)
+                self.conn.execute("UPDATE snippets SET key = snippet_key(body) WHERE key IS NULL")
+
+    def load(self):
+        fresh = not os.path.exists(self.path)
+        self.open()
+        if fresh:
+            if os.path.exists(SNIPPETS_FILE):
+                self.write_all(wrap_data(load_data()))
+            else:
+                self.write_all(wrap_data(DEFAULT_DATA))
+        with self._lock:
+            data = {}
+            names = {}
+            for gid, name in self.conn.execute("SELECT id, name FROM groups ORDER BY ord"):
+                names[gid] = name
+                data[name] = []
+            if SQLITE_LAZY_BODIES:
+                n = SQLITE_PREVIEW_CHARS
+                keys = dict(self.conn.execute("SELECT id, key FROM snippets WHERE key IS NOT NULL"))
+                for sid, gid, head in self.conn.execute(
+                        f"SELECT id, group_id, substr(body, 1, {n + 1}) FROM snippets ORDER BY group_id, pos"):
+                    data[names[gid]].append(LazySnippet(sid, head[:n], self.body, keys.get(sid), len(head) > n))
+            else:
+                for sid, gid, body in self.conn.execute(
+                        "SELECT id, group_id, body FROM snippets ORDER BY group_id, pos"):
+                    data[names[gid]].append(Snippet(body, id=sid))
+            max_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM snippets").fetchone()[0]
+            with self.conn:
+                self._seen = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+                self.conn.execute("DELETE FROM changes WHERE seq <= ?", (self._seen - SQLITE_CHANGES_KEEP,))
+            self._own.clear()
+            self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        # Los Snippet nuevos usan el id como rowid: que no choquen con los persistidos
+        reserve_snippet_ids(max_id)
+        return data
+
+    def make_index(self, data):
+        return FtsIndex(data, self)
+
+    def body(self, sid):
+        """ Texto completo del mensaje sid (lo que LazySnippet.raw pide); "" si ya no existe. """
+        with self._lock:
+            row = self.conn.execute("SELECT body FROM snippets WHERE id = ?", (sid,)).fetchone()
+        return row[0] if row else ""
+
+    def write_all(self, data):
+        """ Reemplaza todo el contenido por data (dict[grupo, list[Snippet]]). """
+        with self._lock, self.conn:
+            # Los textos se leen antes de borrar: los LazySnippet los traen de esta misma base
+            groups = [(g, [(s.id, pos, s.raw, s.key) for pos, s in enumerate(msgs)])
+                      for g, msgs in data.items() if g != VIRTUAL_ALL]
+            self.conn.execute("DELETE FROM snippets")
+            self.conn.execute("DELETE FROM groups")
+            for ord_, (g, rows) in enumerate(groups):
+                gid = self.conn.execute("INSERT INTO groups(name, ord) VALUES (?, ?)", (g, ord_)).lastrowid
+                self.conn.executemany(
+                    "INSERT INTO snippets(id, group_id, pos, body, key) VALUES (?, ?, ?, ?, ?)",
+                    ((sid, gid, pos, body, key) for sid, pos, body, key in rows))
+
+    def apply(self, op, fields, data):
+        g = fields["g"]
+        gid_sql = "(SELECT id FROM groups WHERE name = ?)"
+        rec = {"op": op, **fields}
+        with self._lock, self.conn:
+            c = self.conn
+            if op in ("add", "add_many"):
+                # El rowid lo asigna SQLite (otro proceso puede haber usado el siguiente id):
+                # el Snippet lo adopta antes de que lo vea el índice
+                c.execute("INSERT OR IGNORE INTO groups(name, ord) "
+                          "VALUES (?, (SELECT COALESCE(MAX(ord), 0) + 1 FROM groups))", (g,))
+                gid = c.execute("SELECT id FROM groups WHERE name = ?", (g,)).fetchone()[0]
+                pos = c.execute("SELECT COALESCE(MAX(pos), -1) + 1 FROM snippets WHERE group_id = ?",
+                                (gid,)).fetchone()[0]
+                n = 1 if op == "add" else len(fields["ms"])
+                new = data[g][len(data[g]) - n:]
+                for k, s in enumerate(new):
+                    s.id = c.execute("INSERT INTO snippets(group_id, pos, body, key) VALUES (?, ?, ?, ?)",
+                                     (gid, pos + k, s.raw, s.key)).lastrowid
+                rec["ids"] = [s.id for s in new]
+                if new:
+                    reserve_snippet_ids(new[-1].id)
+            elif op == "edit":
+                s = data[g][fields["i"]]
+                c.execute("UPDATE snippets SET body = ?, key = ? WHERE id = ?", (s.raw, s.key, s.id))
+                rec["id"] = s.id
+            elif op == "del":
+                # Se ubica por texto y cercanía: las posiciones en memoria pueden estar desfasadas
+                i, old = fields["i"], fields.get("old")
+                if old is None:
+                    row = c.execute(f"SELECT id, pos FROM snippets WHERE group_id = {gid_sql} AND pos = ?",
+                                    (g, i)).fetchone()
+                else:
+                    row = c.execute(f"SELECT id, pos FROM snippets WHERE group_id = {gid_sql} AND key = ? "
+                                    "AND body = ? ORDER BY ABS(pos - ?) LIMIT 1",
+                                    (g, snippet_key(old), old, i)).fetchone()
+                if row:
+                    rec["id"] = row[0]
+                    c.execute("DELETE FROM snippets WHERE id = ?", (row[0],))
+                    c.execute(f"UPDATE snippets SET pos = pos - 1 WHERE group_id = {gid_sql} AND pos > ?",
+                              (g, row[1]))
+            elif op == "add_group":
+                c.execute("INSERT OR IGNORE INTO groups(name, ord) "
+                          "VALUES (?, (SELECT COALESCE(MAX(ord), 0) + 1 FROM groups))", (g,))
+            elif op == "rename_group":
+                # Igual que en el dict: el grupo renombrado pasa al final
+                c.execute("UPDATE groups SET name = ?, ord = (SELECT MAX(ord) + 1 FROM groups) WHERE name = ?",
+                          (fields["new"], g))
+            elif op == "del_group":
+                c.execute(f"DELETE FROM snippets WHERE group_id = {gid_sql}", (g,))
+                c.execute("DELETE FROM groups WHERE name = ?", (g,))
+            self._note_change(rec)
+
+    def _note_change(self, rec):
+        seq = self.conn.execute("INSERT INTO changes(rec) VALUES (?)",
+                                (json.dumps(rec, ensure_ascii=False),)).lastrowid
+        self._own.add(seq)
+
+    def compact(self, data, wait=False, dirty=None):
+        """
+        Para este backend "compactar" es reescribir todo (se usa en reemplazos masivos).
+        Cada cambio ya está confirmado en la base: con dirty (ver SnippetJournal.compact) no hay
+        nada que reescribir.
+        """
+        if dirty is None:
+            self.write_all(data)
+        return True
+
+    def flush(self):
+        """ Cada cambio ya se confirmó con su commit: no hay nada diferido. """
+
+    def reset(self, data):
+        """ Reemplazo masivo: se reescribe todo y los demás procesos recargan. """
+        with self._lock:
+            self.write_all(data)
+            with self.conn:
+                self._note_change({"op": "reset"})
+
+    def poll(self):
+        """ Cambios de otros procesos (ver SnippetJournal.poll); sin cambios cuesta un PRAGMA. """
+        with self._lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return []
+            self._data_version = version
+            rows = self.conn.execute("SELECT seq, rec FROM changes WHERE seq > ? ORDER BY seq",
+                                     (self._seen,)).fetchall()
+        changes = []
+        if rows and rows[0][0] > self._seen + 1:
+            # Se recortaron cambios que esta conexión no llegó a leer
+            changes.append({"op": "reload"})
+        for seq, rec in rows:
+            self._seen = seq
+            if seq in self._own:
+                self._own.discard(seq)
+                continue
+            rec = json.loads(rec)
+            changes.append({"op": "reload"} if rec["op"] == "reset" else rec)
+        return changes
+    def close(self):
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+    def fts(self, q, group=None, limit=None, by_rank=True, only=None):
+        """
+        [(id, pos)] de los mensajes que matchean q, por relevancia (bm25) o en el orden
+        de los grupos. group=None/VIRTUAL_ALL: todos; only: restringe a esos ids.
+        """
+        match = fts_query(q)
+        if match is None:
+            return []
+        sql = ("SELECT s.id, s.pos FROM snippets_fts f JOIN snippets s ON s.id = f.rowid "
+               "JOIN groups g ON g.id = s.group_id WHERE snippets_fts MATCH ?")
+        params = [match]
+        if group and group != VIRTUAL_ALL:
+            sql += " AND g.name = ?"
+            params.append(group)
+        if only is not None:
+            sql += f" AND s.id IN ({','.join('?' * len(only))})"
+            params.extend(only)
+        sql += " ORDER BY f.rank" if by_rank else " ORDER BY g.ord, s.pos"
+        sql += " LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+class FtsIndex(SearchIndex):
+    """
+    Índice para el backend SQLite: la búsqueda textual la resuelve FTS5 (con LIMIT);
+    en memoria sólo se lleva id -> Snippet y el orden de cada grupo (sin postings).
+    Las palabras se buscan como prefijos (no subcadenas) y sin distinguir acentos.
+    """
+    def __init__(self, data, storage):
+        self.storage = storage
+        super().__init__(data)
+
+    def _index_words(self, doc_id, snip):
+        pass
+
+    def _unindex_words(self, doc_id, snip):
+        pass
+
+    def search(self, group, q):
+        if not q or fts_query(q) is None:
+            # Sin filtro, o sólo signos: recorrido en memoria (no hay palabras para FTS)
+            return super().search(group, q)
+        return [i for i, _ in self.storage.fts(q, group, by_rank=False) if i in self.docs]
+
+    def search_ranked(self, group, q, limit=SEARCH_TOP_N, boost=None, within=None):
+        if fts_query(q) is None:
+            return super().search_ranked(group, q, limit, within=within)
+        within = None if within is None else set(within)
+        ids = [i for i, _ in self.storage.fts(q, group, limit, only=None if within is None else list(within))]
+        if boost:
+            # Los usados seguido que matchean suben aunque FTS los haya dejado fuera del LIMIT
+            used = list(boost) if within is None else [i for i in boost if i in within]
+            extra = [i for i, _ in self.storage.fts(q, group, only=used)]
+            ids = by_frecency(list(dict.fromkeys(ids + extra)), boost)
+        return [i for i in ids if i in self.docs][:limit]
+
+    def message_rows(self, msgs, g, q):
+        if not q or fts_query(q) is None:
+            return message_rows(msgs, q)
+        # Posiciones de la lista en memoria (las de la base pueden diferir si otro proceso agregó)
+        pos_of = {s.id: pos for pos, s in enumerate(msgs)}
+        rows = self.storage.fts(q, g, SQLITE_FTS_LIMIT, by_rank=False)
+        return [(pos_of[i], i, msgs[pos_of[i]].display) for i, _ in rows if i in pos_of]
+
+def migrate_json_to_sqlite(db_path=None):
+    """ Crea (o rehace) la base SQLite a partir de snippets.json + journal. Devuelve la ruta. """
+    storage = SqliteStorage(db_path)
+    storage.open()
+    storage.write_all(wrap_data(load_data()))
+    storage.close()
+    return storage.path
+
+def open_storage(backend=None):
+    """ Backend pedido (o STORAGE_BACKEND); si SQLite/FTS5 no está disponible se usa JSON. """
+    if (backend or STORAGE_BACKEND) == "sqlite":
+        import sqlite3      # sólo lo carga quien usa este backend
+        try:
+            sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+            return SqliteStorage()
+        except sqlite3.OperationalError:
+            pass
+    return SnippetJournal()
+
+# CLIPBUDDY_SNAPSHOT se valida una vez acá: un valor que no sirve no puede hacer fallar cada
+# compactación en segundo plano. Como con el backend, se sigue con el formato del archivo.
+try:
+    use_snapshot_format(os.environ.get("CLIPBUDDY_SNAPSHOT") or None)
+except ValueError as e:
+    warnings.warn(f"CLIPBUDDY_SNAPSHOT ignorado: {e}", RuntimeWarning)
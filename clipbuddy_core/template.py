@@ -0,0 +1,47 @@
+# clipbuddy_core/template.py
+import re
+
+# ---------- Plantillas ----------
+# {{nombre}} dentro de un mensaje es un campo a completar al pegar. Espacios alrededor del
+# nombre se ignoran ({{ cliente }}); lo que no cierre con }} queda como texto literal.
+_FIELD_RE = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+# Campo que se completa solo con el contenido actual del portapapeles (sin preguntar)
+CLIPBOARD_FIELD = "portapapeles"
+
+class Template:
+    """
+    Mensaje con campos {{nombre}}, compilado una sola vez a una cadena de formato posicional.
+    render() no vuelve a analizar el texto: es un único str.format con los valores en orden.
+    fields: nombres de los campos, sin repetir, en el orden en que aparecen.
+    """
+    __slots__ = ("fields", "_fmt")
+
+    def __init__(self, text):
+        fields, parts, pos = [], [], 0
+        for m in _FIELD_RE.finditer(text):
+            name = m.group(1)
+            if name not in fields:
+                fields.append(name)
+            # Las llaves del texto literal se duplican para que format las deje tal cual
+            parts.append(text[pos:m.start()].replace("{", "{{").replace("}", "}}"))
+            parts.append(f"{{{fields.index(name)}}}")
+            pos = m.end()
+        parts.append(text[pos:].replace("{", "{{").replace("}", "}}"))
+        self.fields = tuple(fields)
+        self._fmt = "".join(parts)
+
+    @property
+    def prompted(self):
+        """ Campos que hay que pedirle al usuario (todos menos el del portapapeles). """
+        return tuple(f for f in self.fields if f != CLIPBOARD_FIELD)
+
+    def render(self, values):
+        """ Texto final; los campos que falten en values quedan vacíos. """
+        return self._fmt.format(*[values.get(f, "") for f in self.fields])
+
+def compile_template(text):
+    """ Template si el texto tiene al menos un campo {{nombre}}; si no, None (se pega tal cual). """
+    if "{{" not in text or not _FIELD_RE.search(text):
+        return None
+    return Template(text)
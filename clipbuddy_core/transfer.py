@@ -0,0 +1,154 @@
+# clipbuddy_core/transfer.py
+# Importación y exportación (CSV / JSONL) en streaming.
+import os, io, csv, json, gzip, itertools
+
+from .config import VIRTUAL_ALL, is_virtual
+from .model import snippet_key
+
+EXPORT_CHUNK_ROWS = 1000        # filas por escritura al exportar
+EXPORT_BUFFER = 1 << 16         # buffer del archivo de salida (sin comprimir)
+
+def iter_export_rows(data, group=None):
+    """ (grupo, mensaje) de todo data o sólo de group; acepta listas de Snippet o de str. """
+    groups = [group] if group and group != VIRTUAL_ALL else list(data)
+    for g in groups:
+        if g == VIRTUAL_ALL:
+            continue
+        for m in tuple(data.get(g, ())):
+            yield g, getattr(m, "raw", m)
+
+def iter_doc_rows(index, ids):
+    """ (grupo, mensaje) de los ids de un resultado de búsqueda (los borrados se saltean). """
+    for doc_id in ids:
+        hit = index.docs.get(doc_id)
+        if hit is not None:
+            yield hit[0], hit[1].raw
+
+def export_format(filepath):
+    """ ("csv" | "jsonl", comprimido) según la extensión: .csv, .jsonl/.ndjson, con .gz opcional. """
+    name = filepath.lower()
+    gz = name.endswith(".gz")
+    if gz:
+        name = name[:-3]
+    return ("jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"), gz
+
+def export_rows(rows, filepath, fmt=None, compress=None, progress=None, total=None):
+    """
+    Escribe filas (grupo, mensaje) en CSV o JSONL (un objeto {"group","message"} por línea),
+    de a EXPORT_CHUNK_ROWS y con gzip si se pide (por defecto, según la extensión).
+    Se escribe a un temporal que se renombra al final: un corte no deja un archivo a medias.
+    progress(fracción) se llama por bloque si se conoce total. Devuelve las filas escritas.
+    """
+    auto_fmt, auto_gz = export_format(filepath)
+    fmt = fmt or auto_fmt
+    compress = auto_gz if compress is None else compress
+    tmp = filepath + ".tmp"
+    if compress:
+        f = gzip.open(tmp, "wt", encoding="utf-8", newline="")
+    else:
+        f = open(tmp, "w", encoding="utf-8", newline="", buffering=EXPORT_BUFFER)
+    n = 0
+    try:
+        with f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(["group", "message"])
+                write = writer.writerows
+            else:
+                def write(chunk):
+                    f.write("".join(json.dumps({"group": g, "message": m}, ensure_ascii=False) + "\n"
+                                    for g, m in chunk))
+            rows = iter(rows)
+            while True:
+                chunk = list(itertools.islice(rows, EXPORT_CHUNK_ROWS))
+                if not chunk:
+                    break
+                write(chunk)
+                n += len(chunk)
+                if progress and total:
+                    progress(min(n / total, 1.0))
+        os.replace(tmp, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return n
+
+def export_to_csv(data, filepath):
+    return export_rows(iter_export_rows(data), filepath, fmt="csv", compress=False)
+
+IMPORT_BATCH_ROWS = 2000    # mensajes nuevos por lote al importar
+IMPORT_PROGRESS_ROWS = 1000 # cada cuántas filas se informa el avance
+
+def _csv_pairs(f):
+    reader = csv.DictReader(f)
+    if not reader.fieldnames or "group" not in reader.fieldnames or "message" not in reader.fieldnames:
+        raise ValueError("El CSV debe tener encabezados: group,message")
+    for row in reader:
+        yield row["group"], row["message"]
+
+def _jsonl_pairs(f):
+    for line in f:
+        if line.strip():
+            obj = json.loads(line)
+            if isinstance(obj, dict):
+                yield obj.get("group"), obj.get("message")
+            else:
+                yield None, None    # no es un {"group", "message"}: se descarta como fila inválida
+
+def read_rows(filepath, progress=None):
+    """
+    Recorre un archivo exportado (CSV o JSONL, con .gz opcional) fila por fila sin cargarlo entero.
+    Las filas sin grupo o sin mensaje de texto (faltantes, null, números; en CSV, filas cortas)
+    y las de grupos virtuales se descartan. progress(fracción) se llama cada tanto con la parte del archivo ya leída.
+    """
+    fmt, gz = export_format(filepath)
+    size = os.path.getsize(filepath) or 1
+    with open(filepath, "rb") as raw:
+        stream = gzip.GzipFile(fileobj=raw) if gz else raw
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="") as f:
+            pairs = _jsonl_pairs(f) if fmt == "jsonl" else _csv_pairs(f)
+            for n, (g, m) in enumerate(pairs, 1):
+                g = g.strip() if isinstance(g, str) else ""
+                if g and not is_virtual(g) and isinstance(m, str):
+                    yield g, m
+                if progress and n % IMPORT_PROGRESS_ROWS == 0:
+                    progress(min(raw.tell() / size, 1.0))
+    if progress:
+        progress(1.0)
+
+def import_csv_batches(filepath, data, replace=False, batch_rows=IMPORT_BATCH_ROWS, progress=None):
+    """
+    Importación en streaming: genera lotes dict[grupo, list[str]] sólo con los mensajes nuevos.
+    Los repetidos (contra data y contra lo ya leído) se descartan con un set de huellas por grupo,
+    así cada fila cuesta O(1) y en memoria queda un lote a la vez (más los sets).
+    data: listas de Snippet (se usa su key: con SQLite no hace falta leer los textos) o de str.
+    """
+    seen = {} if replace else {g: {getattr(m, "key", None) or snippet_key(m) for m in msgs}
+                                for g, msgs in data.items()}
+    batch, n = {}, 0
+    for g, m in read_rows(filepath, progress):
+        s = seen.get(g)
+        if s is None:
+            s = seen[g] = set()
+        key = snippet_key(m)
+        if key in s:
+            continue
+        s.add(key)
+        batch.setdefault(g, []).append(m)
+        n += 1
+        if n >= batch_rows:
+            yield batch
+            batch, n = {}, 0
+    if batch:
+        yield batch
+
+def import_from_csv(filepath, data, replace=False):
+    new_data = {} if replace else {g: list(msgs) for g, msgs in data.items()}
+    for batch in import_csv_batches(filepath, data, replace=replace):
+        for g, msgs in batch.items():
+            new_data.setdefault(g, []).extend(msgs)
+    new_data.pop(VIRTUAL_ALL, None)
+    return new_data
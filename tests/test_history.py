@@ -0,0 +1,35 @@
+# tests/test_history.py
+#   python -m unittest discover -s tests   (o python -m pytest tests)
+import os, sys, time, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import clipbuddy_core as cb
+
+class SkipTest(unittest.TestCase):
+    """ Lo que pega la app no entra al historial, pero un skip que nadie consumió no se queda para siempre. """
+    def setUp(self):
+        self.history = cb.ClipboardHistory()
+
+    def tearDown(self):
+        self.history.close()
+
+    def test_skip_ignores_the_next_copy_only(self):
+        self.history.skip("hola")
+        self.assertFalse(self.history.add("hola"))
+        self.assertTrue(self.history.add("hola"))
+        self.assertEqual([e.raw for e in self.history.entries()], ["hola"])
+
+    def test_skip_expires(self):
+        self.history.skip("hola", seconds=0.01)
+        time.sleep(0.02)
+        version = self.history.version
+        self.assertTrue(self.history.add("hola"))
+        self.assertGreater(self.history.version, version)
+
+    def test_unskip(self):
+        self.history.skip("hola")
+        self.history.unskip("hola")
+        self.assertTrue(self.history.add("hola"))
+
+if __name__ == "__main__":
+    unittest.main()
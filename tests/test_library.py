@@ -0,0 +1,29 @@
+# tests/test_library.py
+#   python -m unittest discover -s tests   (o python -m pytest tests)
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import clipbuddy_core as cb
+
+class VirtualGroupsTest(unittest.TestCase):
+    """ Los nombres de los grupos virtuales no pueden pasar a ser grupos reales. """
+    def test_reserved_names(self):
+        data = cb.Library(cb.wrap_data({"A": ["a"]}))
+        for name in cb.VIRTUAL_GROUPS:
+            with self.assertRaises(ValueError):
+                data.add_group(name)
+            with self.assertRaises(ValueError):
+                data.rename_group("A", name)
+            with self.assertRaises(ValueError):
+                data.add(name, "x")
+            with self.assertRaises(ValueError):
+                data.add_many(name, ["x"])
+        self.assertEqual(cb.raw_data(data), {"A": ["a"]})
+        self.assertEqual(data.version, 0)
+
+    def test_listing_hides_a_real_group_with_a_reserved_name(self):
+        data = cb.Library(cb.wrap_data({"A": ["a"], cb.VIRTUAL_HISTORY: ["viejo"]}))
+        self.assertEqual(cb.all_group_names(data), [cb.VIRTUAL_ALL, "A"])
+
+if __name__ == "__main__":
+    unittest.main()
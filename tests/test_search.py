@@ -0,0 +1,48 @@
+# tests/test_search.py
+#   python -m unittest discover -s tests   (o python -m pytest tests)
+import os, random, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import clipbuddy_core as cb
+from bench_search import synthetic_data, QUERIES
+
+class RefineRankedTest(unittest.TestCase):
+    """ Refinar el resultado de un prefijo tiene que dar lo mismo que buscar en todo. """
+    def test_new_trigram_candidates(self):
+        index = cb.SearchIndex(cb.wrap_data({"g": ["axbxcxdxdefx zz", "abcde other"]}))
+        prev = index.search_ranked("g", "abcde")
+        self.assertFalse(cb.narrows("abcde", "abcdef"))
+        refined = index.refine_ranked("g", "abcdef", "abcde", prev)
+        self.assertIn(refined, (None, index.search_ranked("g", "abcdef")))
+
+    def test_matches_full_search_while_typing(self):
+        data = cb.wrap_data(synthetic_data(5000, seed=2))
+        index = cb.SearchIndex(data)
+        rnd = random.Random(2)
+        words = "hola envio gratis kit insumos fermentacion malta lupulo mercadolibre calculadora".split()
+        queries = QUERIES + [" ".join(rnd.sample(words, 2)) for _ in range(20)]
+        for group in (cb.VIRTUAL_ALL, list(data)[3]):
+            for q in queries:
+                for k in range(1, len(q)):
+                    prev, cur = q[:k], q[:k + 1]
+                    refined = index.refine_ranked(group, cur, prev, index.search_ranked(group, prev))
+                    if refined is not None:
+                        self.assertEqual(set(refined), set(index.search_ranked(group, cur)), (group, prev, cur))
+
+    def test_matches_full_search_on_near_words(self):
+        # Alfabeto chico: muchas palabras parecidas, errores de tipeo y trigramas compartidos
+        rnd = random.Random(7)
+        for _ in range(60):
+            words = ["".join(rnd.choices("abcdx", k=rnd.randint(3, 10))) for _ in range(40)]
+            docs = [" ".join(rnd.sample(words, rnd.randint(1, 3))) for _ in range(60)]
+            index = cb.SearchIndex(cb.wrap_data({"g": docs}))
+            for _ in range(10):
+                q = rnd.choice(words)[:rnd.randint(2, 10)] + rnd.choice(["", "x", "ab", " ab"])
+                for k in range(1, len(q)):
+                    prev, cur = q[:k], q[:k + 1]
+                    refined = index.refine_ranked("g", cur, prev, index.search_ranked("g", prev))
+                    if refined is not None:
+                        self.assertEqual(set(refined), set(index.search_ranked("g", cur)), (docs, prev, cur))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+# tests/test_storage.py
+#   python -m unittest discover -s tests   (o python -m pytest tests)
+import glob, os, shutil, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import clipbuddy_core as cb
+import clipbuddy_core.cli
+from clipbuddy_core import storage as st
+
+class SnapshotRaceTest(unittest.TestCase):
+    """ Una importación que reemplaza no puede pisarse con una compactación en segundo plano. """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="clipbuddy-test-")
+        self.old_file = st.SNIPPETS_FILE
+        cb.use_snippets_file(os.path.join(self.dir, "snippets.json"))
+
+    def tearDown(self):
+        cb.use_snippets_file(self.old_file)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_reset_during_background_compaction(self):
+        big = {f"G{g}": [f"mensaje {g}-{i} " + "x" * 40 for i in range(5000)] for g in range(8)}
+        replacement = {"Nuevo": ["uno", "dos"]}
+        for _ in range(3):
+            journal = cb.SnippetJournal()
+            data = cb.Library(journal.load())
+            data.observe(lambda op, fields, local: journal.reset(data) if op in cb.FULL_OPS
+                         else journal.apply(op, fields, data))
+            data.replace(cb.wrap_data(big))
+            data.add("G0", "uno más")
+            journal.compact(data)               # sin esperar: el snapshot se escribe en otro hilo
+            data.replace(cb.wrap_data(replacement))
+            journal.close()
+            self.assertEqual(cb.load_data(), replacement)
+            self.assertEqual(glob.glob(os.path.join(self.dir, "*.tmp")), [])
+
+    def test_compaction_recopies_only_dirty_groups(self):
+        journal = cb.SnippetJournal()
+        data = cb.Library(journal.load())
+        data.observe(lambda op, fields, local: journal.reset(data) if op in cb.FULL_OPS
+                     else journal.apply(op, fields, data))
+        data.replace(cb.wrap_data({"A": ["a1", "a2"], "B": ["b1"], "C": []}))
+        self.assertTrue(journal.compact(data, wait=True, dirty=data.clear_dirty()))
+        clean = journal._copied["B"]
+        data.add("A", "a3")
+        data.rename_group("C", "D")
+        journal.flush()                         # escrito antes que lo ajeno: no hace falta recargar
+        other = cb.SnippetJournal()             # otro proceso que también cambia la biblioteca
+        remote = cb.Library(other.load())
+        remote.observe(lambda op, fields, local: other.apply(op, fields, remote))
+        remote.edit("B", 0, "b1 editado")
+        other.flush()
+        for rec in journal.poll():
+            data.apply_remote(rec)
+        self.assertEqual(data.dirty, {"A", "B", "C", "D"})
+        self.assertTrue(journal.compact(data, wait=True, dirty=data.clear_dirty()))
+        self.assertIsNot(journal._copied["B"], clean)
+        self.assertEqual(st.read_snapshot()[0], cb.raw_data(data))
+        data.add("A", "a4")
+        self.assertTrue(journal.compact(data, wait=True, dirty=data.clear_dirty()))
+        self.assertEqual(st.read_snapshot()[0], cb.raw_data(data))
+        other.close()
+        journal.close()
+
+    def open_library(self):
+        """ (journal, biblioteca) como los abre un proceso: persiste lo local, aplica lo ajeno. """
+        journal = cb.SnippetJournal()
+        data = cb.Library(journal.load())
+        data.observe(lambda op, fields, local: cb.cli.persist(journal, data, op, fields, local))
+        return journal, data
+
+    def sync(self, journal, data):
+        for rec in journal.poll():
+            if rec["op"] == "reload":
+                data.replace(journal.load(), op="reload", local=False)
+                break
+            data.apply_remote(rec)
+
+    def test_queued_change_behind_foreign_rename(self):
+        a, da = self.open_library()
+        b, db = self.open_library()
+        da.add("General", "x")                  # queda encolado (escritura diferida)
+        db.rename_group("General", "Gral")
+        b.flush()
+        self.assertFalse(a.compact(da, wait=True))  # el orden en memoria no es el del disco
+        self.sync(a, da)
+        self.sync(b, db)
+        self.assertEqual(cb.raw_data(da), cb.load_data())
+        self.assertEqual(cb.raw_data(db), cb.load_data())
+        self.assertTrue(a.compact(da, wait=True))
+        a.close()
+        b.close()
+
+    def test_reload_writes_the_queue_first(self):
+        a, da = self.open_library()
+        b, db = self.open_library()
+        da.add("General", "x")
+        db.replace(cb.wrap_data({"General": ["nuevo"]}))
+        self.sync(a, da)
+        a.flush()
+        self.sync(b, db)
+        self.assertEqual(cb.raw_data(da), cb.load_data())
+        self.assertEqual(cb.raw_data(db), cb.load_data())
+        a.close()
+        b.close()
+
+    @unittest.skipIf(os.name == "nt", "permisos POSIX")
+    def test_snapshot_keeps_file_permissions(self):
+        cb.save_data({"A": ["a"]})
+        os.chmod(st.SNIPPETS_FILE, 0o664)
+        cb.save_data({"A": ["a", "b"]})
+        self.assertEqual(os.stat(st.SNIPPETS_FILE).st_mode & 0o777, 0o664)
+        os.remove(st.SNIPPETS_FILE)
+        cb.save_data({"A": ["a"]})
+        self.assertEqual(os.stat(st.SNIPPETS_FILE).st_mode & 0o777, 0o666 & ~st._UMASK)
+
+    def test_unusable_snapshot_format_fails_up_front(self):
+        with self.assertRaises(ValueError):
+            cb.use_snapshot_format("gzip")
+        try:
+            import zstandard    # noqa: F401
+        except ImportError:
+            with self.assertRaises(ValueError):
+                cb.use_snapshot_format("zstd")
+        self.assertIsNone(st.SNAPSHOT_FORMAT)
+
+    def test_failed_snapshot_leaves_no_temp_file(self):
+        with self.assertRaises(TypeError):
+            cb.save_data({"A": [object()]})
+        self.assertEqual(glob.glob(os.path.join(self.dir, "*.tmp")), [])
+
+    def test_each_snapshot_gets_its_own_temp_file(self):
+        a = st._snapshot_tmp({"A": ["a"]})
+        b = st._snapshot_tmp({"B": ["b"]})
+        self.assertNotEqual(a, b)
+        for tmp in (a, b):
+            os.remove(tmp)
+
+class UsageStoreTest(unittest.TestCase):
+    """ Dos procesos con la misma biblioteca no se borran los usos al escribir. """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="clipbuddy-test-")
+        self.old_file = st.SNIPPETS_FILE
+        cb.use_snippets_file(os.path.join(self.dir, "snippets.json"))
+
+    def tearDown(self):
+        cb.use_snippets_file(self.old_file)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_flush_merges_with_other_processes(self):
+        a, b = cb.UsageStore(), cb.UsageStore()
+        ka, kb, both = cb.snippet_key("a"), cb.snippet_key("b"), cb.snippet_key("ambos")
+        a.record(ka, now=1000)
+        a.record(both, now=1000)
+        b.record(kb, now=2000)
+        for n in range(3):
+            b.record(both, now=2000 + n)
+        a.flush(wait=True)
+        b.flush(wait=True)
+        a.record(ka, now=3000)
+        a.flush(wait=True)
+        disk = cb.UsageStore().stats
+        self.assertEqual({k: v[1:] for k, v in disk.items()},
+                         {ka: (3000, 2), kb: (2000, 1), both: (2002, 3)})
+        self.assertEqual(a.stats[kb][1:], (2000, 1))    # lo ajeno vuelve a memoria
+        self.assertEqual(glob.glob(os.path.join(self.dir, "*.tmp")), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+# tests/test_transfer.py
+#   python -m unittest discover -s tests   (o python -m pytest tests)
+import json, os, shutil, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import clipbuddy_core as cb
+
+class ReadRowsTest(unittest.TestCase):
+    """ Las filas sin grupo o sin mensaje de texto no se importan como "None". """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="clipbuddy-test-")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def test_jsonl_skips_rows_without_group_or_message(self):
+        rows = [{"group": "G", "message": "ok"}, {"message": "sin grupo"}, {"group": "G"},
+                {"group": None, "message": "x"}, {"group": "G", "message": 5}, ["G", "lista"]]
+        path = self.write("datos.jsonl", "".join(json.dumps(r) + "\n" for r in rows))
+        self.assertEqual(list(cb.read_rows(path)), [("G", "ok")])
+
+    def test_csv_skips_short_rows(self):
+        path = self.write("datos.csv", "group,message\nG,ok\nsolo grupo\n")
+        self.assertEqual(list(cb.read_rows(path)), [("G", "ok")])
+
+    def test_virtual_groups_are_not_imported(self):
+        path = self.write("datos.csv", f"group,message\n{cb.VIRTUAL_HISTORY},a\n{cb.VIRTUAL_ALL},b\nG,c\n")
+        self.assertEqual(list(cb.read_rows(path)), [("G", "c")])
+
+if __name__ == "__main__":
+    unittest.main()